@@ -0,0 +1,164 @@
+import argparse
+import datetime
+import threading
+from collections import namedtuple
+
+from database_manager import DatabaseManager, ACHIEVEMENT_COUNTER_COLUMNS
+
+# Achievements are declared as data: a rule unlocks once its metric reaches the threshold.
+# Lifetime reps and streaks come from running counters persisted per exercise (and for all
+# exercises together), so evaluating a workout reads two counter rows and checks each rule once,
+# however long the history is. Session metrics come from the workout itself.
+METRIC_LIFETIME_REPS = "lifetime_reps"
+METRIC_SESSION_REPS = "session_reps"
+METRIC_STREAK_DAYS = "streak_days"
+METRIC_REPS_PER_MINUTE = "reps_per_minute"
+
+# exercise_type None applies the rule to all exercises together
+AchievementRule = namedtuple("AchievementRule", ["name", "metric", "threshold", "exercise_type"])
+
+ACHIEVEMENT_RULES = (
+    AchievementRule("First 100 Pushups!", METRIC_SESSION_REPS, 100, "Pushup"),
+    AchievementRule("100 Squats in One Session", METRIC_SESSION_REPS, 100, "Squat"),
+    AchievementRule("1,000 Lifetime Pushups", METRIC_LIFETIME_REPS, 1000, "Pushup"),
+    AchievementRule("1,000 Lifetime Squats", METRIC_LIFETIME_REPS, 1000, "Squat"),
+    AchievementRule("10,000 Lifetime Reps", METRIC_LIFETIME_REPS, 10000, None),
+    AchievementRule("3-Day Streak", METRIC_STREAK_DAYS, 3, None),
+    AchievementRule("7-Day Streak", METRIC_STREAK_DAYS, 7, None),
+    AchievementRule("30-Day Streak", METRIC_STREAK_DAYS, 30, None),
+    AchievementRule("30 Pushups per Minute", METRIC_REPS_PER_MINUTE, 30, "Pushup"),
+    AchievementRule("30 Squats per Minute", METRIC_REPS_PER_MINUTE, 30, "Squat"),
+)
+
+# Counter scope covering every exercise
+ALL_EXERCISES = "*"
+
+# Shorter sessions don't count towards reps per minute: a few quick reps aren't a pace
+MIN_RATE_SECONDS = 60
+
+AchievementCounters = namedtuple("AchievementCounters", ACHIEVEMENT_COUNTER_COLUMNS)
+EMPTY_COUNTERS = AchievementCounters(0, 0, 0, 0.0, 0, 0, None)
+
+_ONE_DAY = datetime.timedelta(days=1)
+
+def session_rate(completed_reps, duration_seconds):
+    if not duration_seconds or duration_seconds < MIN_RATE_SECONDS:
+        return 0.0
+    return completed_reps * 60.0 / duration_seconds
+
+def update_counters(counters, completed_reps, duration_seconds, day):
+    # The counters after one more workout on `day` (a datetime.date). Pure and O(1).
+    # A streak is the number of consecutive days with at least one workout.
+    streak, last_day = 1, day.isoformat()
+    # ISO dates compare like the dates themselves, so most workouts don't need parsing
+    if counters.last_day is not None and last_day <= counters.last_day:
+        # Another workout the same day (or an out-of-order import) doesn't change the streak
+        streak, last_day = counters.current_streak, counters.last_day
+    elif counters.last_day is not None and day == datetime.date.fromisoformat(counters.last_day) + _ONE_DAY:
+        streak = counters.current_streak + 1
+    return AchievementCounters(
+        workouts=counters.workouts + 1,
+        lifetime_reps=counters.lifetime_reps + completed_reps,
+        best_session_reps=max(counters.best_session_reps, completed_reps),
+        best_reps_per_minute=max(counters.best_reps_per_minute, session_rate(completed_reps, duration_seconds)),
+        current_streak=streak,
+        longest_streak=max(counters.longest_streak, streak),
+        last_day=last_day,
+    )
+
+class AchievementEngine:
+    def __init__(self, rules=ACHIEVEMENT_RULES):
+        self.rules = tuple(rules)
+        # Serialises read-modify-write of the counters between threads of this process
+        self._lock = threading.RLock()
+
+    def evaluate(self, counters, exercise_type, completed_reps, duration_seconds, day, unlocked=()):
+        # One workout against the counters (scope -> AchievementCounters) from before it.
+        # Returns (updated counters for the workout's scopes, names of rules newly met).
+        updated = {scope: update_counters(counters.get(scope, EMPTY_COUNTERS), completed_reps, duration_seconds, day)
+                   for scope in (exercise_type, ALL_EXERCISES)}
+        rate = session_rate(completed_reps, duration_seconds)
+        met = []
+        for rule in self.rules:
+            if rule.name in unlocked or rule.exercise_type not in (None, exercise_type):
+                continue
+            scope_counters = updated[rule.exercise_type or ALL_EXERCISES]
+            if rule.metric == METRIC_LIFETIME_REPS:
+                value = scope_counters.lifetime_reps
+            elif rule.metric == METRIC_STREAK_DAYS:
+                value = scope_counters.current_streak
+            elif rule.metric == METRIC_REPS_PER_MINUTE:
+                value = rate
+            else:
+                value = completed_reps
+            if value >= rule.threshold:
+                met.append(rule.name)
+        return updated, met
+
+    def record_workout(self, db_manager, exercise_type, completed_reps, duration_seconds=None, reps=None):
+        # Saves a workout (with its per-rep records, if any), advances the counters and unlocks what it
+        # earned, all in one transaction; returns the new achievements
+        with self._lock:
+            # Reads see committed saves only: wait for workouts still queued (e.g. from another thread)
+            db_manager.flush()
+            stored = db_manager.get_achievement_counters((exercise_type, ALL_EXERCISES))
+            if ALL_EXERCISES not in stored:
+                # No counters yet, e.g. history from before the engine existed: count it first
+                self.backfill(db_manager)
+                stored = db_manager.get_achievement_counters((exercise_type, ALL_EXERCISES))
+            now = datetime.datetime.now()
+            counters = {scope: AchievementCounters(*values) for scope, values in stored.items()}
+            _, met = self.evaluate(counters, exercise_type, completed_reps, duration_seconds, now.date(),
+                                   db_manager.get_achievement_names())
+            # The database advances the stored counters itself (the same way update_counters() does)
+            db_manager.save_workout_progress(exercise_type, completed_reps, duration_seconds, now, reps,
+                                             (exercise_type, ALL_EXERCISES),
+                                             session_rate(completed_reps, duration_seconds), met)
+            return met
+
+    def backfill(self, db_manager, page_size=5000):
+        # Recomputes every counter and achievement in one chronological pass over the workouts,
+        # e.g. after importing history; achievements are dated by the workout that earned them.
+        # Returns the achievements earned, including ones already unlocked.
+        with self._lock:
+            db_manager.flush()
+            counters, unlocked, names = {}, [], set()
+            after = None
+            while True:
+                rows = db_manager.get_workouts_page(page_size, after, "date", descending=False)
+                for _, date, exercise_type, completed_reps, duration_seconds, _ in rows:
+                    updated, met = self.evaluate(counters, exercise_type, completed_reps, duration_seconds,
+                                                 datetime.date.fromisoformat(date[:10]), names)
+                    counters.update(updated)
+                    names.update(met)
+                    unlocked.extend((date, name) for name in met)
+                if len(rows) < page_size:
+                    break
+                after = (rows[-1][-1], rows[-1][0])
+            db_manager.save_achievement_progress(counters, unlocked, replace=True)
+            db_manager.flush()
+            return unlocked
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_achievement_engine():
+    # Process-wide engine, so every thread updates the counters under the same lock
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AchievementEngine()
+        return _engine
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-evaluate achievements over the whole workout history.")
+    parser.add_argument("--db", type=str, default="workout_history.db", help="Database file.")
+    args = parser.parse_args(argv)
+
+    db_manager = DatabaseManager(args.db)
+    unlocked = get_achievement_engine().backfill(db_manager)
+    db_manager.close()
+    print(f"{len(unlocked)} achievement(s) earned over the history.")
+
+if __name__ == "__main__":
+    main()
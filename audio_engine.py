@@ -0,0 +1,154 @@
+import logging
+import os
+import queue
+import threading
+import time
+
+# Audio cues by ID. Every cue is decoded once when the engine starts; the hot path
+# only enqueues an ID for the mixer thread.
+CUE_GO_DEEPER = "go_deeper"
+CUE_REP_COUNT = "rep_count"
+
+CUE_FILES = {
+    CUE_GO_DEEPER: "audio/go_deeper.wav",
+    CUE_REP_COUNT: "audio/rep_count.wav",
+}
+
+# Minimum seconds between two plays of the same cue
+DEFAULT_COOLDOWNS = {
+    CUE_GO_DEEPER: 2.0,
+    CUE_REP_COUNT: 0.0,
+}
+
+# A cue triggered continuously (e.g. every frame while a joint is held past a threshold)
+# only plays again after triggers have paused for this many seconds
+DEFAULT_DEBOUNCE = 0.25
+
+class SilentAudioBackend:
+    # Stand-in for headless and test runs: accepts every cue and plays nothing
+    def load(self, file_path):
+        return file_path
+
+    def play(self, sound):
+        return None
+
+    def is_playing(self, handle):
+        return False
+
+    def stop_all(self):
+        pass
+
+class SimpleAudioBackend:
+    def __init__(self):
+        import simpleaudio
+        self._sa = simpleaudio
+
+    def load(self, file_path):
+        return self._sa.WaveObject.from_wave_file(file_path)
+
+    def play(self, sound):
+        return sound.play()
+
+    def is_playing(self, handle):
+        return handle is not None and handle.is_playing()
+
+    def stop_all(self):
+        self._sa.stop_all()
+
+def default_backend():
+    try:
+        return SimpleAudioBackend()
+    except Exception as e:
+        logging.warning(f"Audio playback unavailable, using silent audio backend: {e}")
+        return SilentAudioBackend()
+
+class AudioEngine:
+    def __init__(self, backend=None, cue_files=None, cooldowns=None, debounce=DEFAULT_DEBOUNCE, max_pending=8):
+        self.backend = backend if backend is not None else default_backend()
+        self.cooldowns = dict(DEFAULT_COOLDOWNS if cooldowns is None else cooldowns)
+        self.debounce = debounce
+        self.sounds = {}
+        self._last_trigger = {}
+        self._last_played = {}
+        self._playing = {}
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._load_cues(CUE_FILES if cue_files is None else cue_files)
+
+    def _load_cues(self, cue_files):
+        for cue_id, file_path in cue_files.items():
+            if not os.path.exists(file_path):
+                logging.warning(f"Audio file not found: {file_path}")
+                continue
+            try:
+                self.sounds[cue_id] = self.backend.load(file_path)
+            except Exception as e:
+                logging.error(f"Error loading audio file {file_path}: {e}")
+
+    def trigger(self, cue_id):
+        # Called from the inference thread on every frame a cue applies; must stay cheap
+        if cue_id not in self.sounds:
+            return
+        now = time.monotonic()
+        last_trigger = self._last_trigger.get(cue_id)
+        self._last_trigger[cue_id] = now
+        if last_trigger is not None and now - last_trigger < self.debounce:
+            return
+        if now - self._last_played.get(cue_id, float("-inf")) < self.cooldowns.get(cue_id, 0.0):
+            return
+
+        self._last_played[cue_id] = now
+        self._ensure_mixer()
+        try:
+            self._queue.put_nowait(cue_id)
+        except queue.Full:
+            pass  # Drop the cue rather than block the caller
+
+    def _ensure_mixer(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._mixer_loop, name="AudioMixer", daemon=True)
+                    self._thread.start()
+
+    def _mixer_loop(self):
+        while True:
+            cue_id = self._queue.get()
+            if cue_id is None:
+                break
+            # Don't stack a cue on top of itself while it is still playing
+            if self.backend.is_playing(self._playing.get(cue_id)):
+                continue
+            try:
+                self._playing[cue_id] = self.backend.play(self.sounds[cue_id])
+            except Exception as e:
+                logging.error(f"Error playing audio cue {cue_id}: {e}")
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(1.0)
+            self._thread = None
+        try:
+            self.backend.stop_all()
+        except Exception as e:
+            logging.error(f"Error stopping audio playback: {e}")
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_audio_engine():
+    # Process-wide engine, created (and its cues decoded) on first use
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = AudioEngine()
+    return _engine
+
+def set_audio_engine(engine):
+    # Replace the shared engine, e.g. with AudioEngine(SilentAudioBackend()) for headless runs
+    global _engine
+    with _engine_lock:
+        _engine = engine
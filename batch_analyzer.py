@@ -0,0 +1,204 @@
+import argparse
+import csv
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import time
+
+import cv2
+
+from exercise_registry import exercise_names
+from movement_detector import create_detector
+from landmark_cache import LandmarkCache, video_cache_key, DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+# One detector (and therefore one MediaPipe Pose graph) per worker process
+_worker_detector = None
+_worker_exercise = None
+_worker_cache = None
+
+def collect_videos(inputs):
+    # Each input may be a directory, a glob pattern or a plain file path
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for name in os.listdir(item):
+                if name.lower().endswith(VIDEO_EXTENSIONS):
+                    paths.add(os.path.join(item, name))
+        else:
+            for path in glob.glob(item):
+                if os.path.isfile(path):
+                    paths.add(path)
+    return sorted(paths)
+
+def _init_worker(exercise, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES):
+    global _worker_detector, _worker_exercise, _worker_cache
+    # Parallelism comes from the pool; keep OpenCV from oversubscribing the cores
+    cv2.setNumThreads(1)
+    _worker_exercise = exercise
+    _worker_detector = create_detector(exercise, enable_sound=False, draw_landmarks=False)
+    _worker_cache = LandmarkCache(cache_dir, cache_max_bytes) if cache_dir else None
+
+def analyze_video(path):
+    detector = _worker_detector
+    detector.reset()
+    result = {
+        "file": path,
+        "exercise": _worker_exercise,
+        "reps": 0,
+        "rep_timestamps": [],
+        "frames": 0,
+        "video_seconds": 0.0,
+        "processing_seconds": 0.0,
+        "fps": 0.0,
+        "cached": False,
+        "error": None,
+    }
+
+    start = time.perf_counter()
+    try:
+        cache_key = video_cache_key(path, detector.pose_settings) if _worker_cache else None
+        cached_frames, video_fps = _worker_cache.load(cache_key) if _worker_cache else (None, None)
+        if cached_frames is not None:
+            result["cached"] = True
+            _count_cached(detector, cached_frames, video_fps, result)
+        else:
+            video_fps = _count_video(detector, path, cache_key, result)
+    except Exception as e:
+        result["error"] = str(e)
+
+    elapsed = time.perf_counter() - start
+    result["reps"] = detector.counter
+    result["video_seconds"] = round(result["frames"] / video_fps, 3) if video_fps else 0.0
+    result["processing_seconds"] = round(elapsed, 3)
+    result["fps"] = round(result["frames"] / elapsed, 2) if elapsed else 0.0
+    return result
+
+def _record_rep(detector, result, last_count, timestamp):
+    if detector.counter != last_count:
+        result["rep_timestamps"].append(round(timestamp, 3))
+    return detector.counter
+
+def _count_cached(detector, cached_frames, video_fps, result):
+    # Re-scores cached landmarks in one vectorised pass, without decoding the video or running the model
+    replay = detector.replay_landmarks(cached_frames)
+    if video_fps:
+        result["rep_timestamps"] = [round(frame / video_fps, 3) for frame in replay.rep_frames.tolist()]
+    result["frames"] = len(cached_frames)
+
+def _count_video(detector, path, cache_key, result):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError("Could not open video file")
+
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    cache_writer = _worker_cache.writer(cache_key, video_fps) if _worker_cache else None
+    last_count = 0
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if video_fps:
+                timestamp = result["frames"] / video_fps
+            else:
+                timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            detector.process_frame(frame, timestamp)
+            if cache_writer:
+                cache_writer.append(detector.last_landmarks)
+            last_count = _record_rep(detector, result, last_count, timestamp)
+            result["frames"] += 1
+    finally:
+        cap.release()
+
+    if cache_writer:
+        cache_writer.commit()
+    return video_fps
+
+def run_batch(paths, exercise, workers=None, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES):
+    workers = workers or os.cpu_count() or 1
+    workers = max(1, min(workers, len(paths)))
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=_init_worker,
+                              initargs=(exercise, cache_dir, cache_max_bytes)) as pool:
+        results = []
+        for result in pool.imap_unordered(analyze_video, paths, chunksize=1):
+            status = result["error"] or f"{result['reps']} reps, {result['fps']} fps" + (" (cached)" if result["cached"] else "")
+            print(f"[{len(results) + 1}/{len(paths)}] {result['file']}: {status}")
+            results.append(result)
+    elapsed = time.perf_counter() - start
+
+    results.sort(key=lambda r: r["file"])
+    total_frames = sum(r["frames"] for r in results)
+    summary = {
+        "exercise": exercise,
+        "files": len(results),
+        "failed": sum(1 for r in results if r["error"]),
+        "cache_hits": sum(1 for r in results if r["cached"]),
+        "workers": workers,
+        "total_frames": total_frames,
+        "total_reps": sum(r["reps"] for r in results),
+        "wall_seconds": round(elapsed, 3),
+        "throughput_fps": round(total_frames / elapsed, 2) if elapsed else 0.0,
+    }
+    return results, summary
+
+def write_report(results, summary, report_path):
+    if report_path.lower().endswith(".csv"):
+        fields = ["file", "exercise", "reps", "rep_timestamps", "frames", "video_seconds",
+                  "processing_seconds", "fps", "cached", "error"]
+        with open(report_path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for result in results:
+                row = dict(result)
+                row["rep_timestamps"] = " ".join(str(t) for t in result["rep_timestamps"])
+                writer.writerow(row)
+    else:
+        with open(report_path, "w") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless batch analysis of recorded workout videos.")
+    parser.add_argument("inputs", nargs="+",
+                        help="Video files, directories or glob patterns to analyse.")
+    parser.add_argument("--exercise", type=str, default="pushup", choices=exercise_names(),
+                        help="Exercise to count in every video.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes. Defaults to the number of CPU cores.")
+    parser.add_argument("--report", type=str, default="batch_report.json",
+                        help="Report path. A .csv extension writes CSV, anything else writes JSON.")
+    add_cache_arguments(parser)
+    args = parser.parse_args(argv)
+    run_batch_cli(args.inputs, args.exercise, args.workers, args.report, cache_dir_from_args(args), args.cache_max_mb)
+
+def add_cache_arguments(parser):
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR,
+                        help="Directory for cached pose landmarks; re-analysing a cached video skips pose inference.")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024),
+                        help="Size limit of the landmark cache; least recently used entries are evicted.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always run pose inference and don't write the landmark cache.")
+
+def cache_dir_from_args(args):
+    return None if args.no_cache else args.cache_dir
+
+def run_batch_cli(inputs, exercise, workers, report_path, cache_dir=None, cache_max_mb=DEFAULT_MAX_BYTES // (1024 * 1024)):
+    paths = collect_videos(inputs)
+    if not paths:
+        print("Error: No video files found for the given inputs.")
+        return
+
+    print(f"Analysing {len(paths)} video(s) for {exercise}...")
+    results, summary = run_batch(paths, exercise, workers, cache_dir, cache_max_mb * 1024 * 1024)
+    write_report(results, summary, report_path)
+    print(f"Processed {summary['total_frames']} frames in {summary['wall_seconds']}s "
+          f"({summary['throughput_fps']} fps) with {summary['workers']} worker(s).")
+    print(f"Report written to {report_path}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
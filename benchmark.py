@@ -0,0 +1,369 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from pose_features import NUM_LANDMARKS, joint_angles
+from pose_profile import PROFILES, DEFAULT_PROFILE
+from exercise_registry import EXERCISES
+from rep_counting import count_reps, rule_angle, step
+
+# Benchmarks the per-frame pipeline stage by stage and writes the results as JSON, so runs
+# from two revisions can be compared with --compare before a release goes out to the kiosks.
+#
+# Sources:
+#   --synthetic N     N generated frames (no camera or files needed)
+#   --video PATH      a recorded clip
+#   --landmarks PATH  a cached (frames, 33, 4) landmark fixture (.npy); benchmarks counting only
+#   --memory N        N generated frames through process_frame under tracemalloc, reporting how
+#                     much memory the steady-state per-frame path allocates (should be ~0)
+#
+# Image sources run the shipped per-frame path, create_detector(...).process_frame with the
+# chosen performance options (profile resize, ROI crop, motion gate, adaptive inference), then
+# the GUI's display conversion (when PyQt5 is installed), and report the pipeline's own stage
+# timers: motion_gate, resize, color_conversion, inference, counting, drawing, qimage_conversion.
+
+RULES = {name: definition.rule for name, definition in EXERCISES.items()}
+
+# Label size the GUI scales frames into
+DISPLAY_SIZE = (640, 480)
+
+def percentile_summary(samples):
+    samples = np.asarray(samples, dtype=np.float64) * 1000.0
+    if len(samples) == 0:
+        return None
+    return {
+        "mean_ms": round(float(samples.mean()), 4),
+        "p50_ms": round(float(np.percentile(samples, 50)), 4),
+        "p95_ms": round(float(np.percentile(samples, 95)), 4),
+        "p99_ms": round(float(np.percentile(samples, 99)), 4),
+        "max_ms": round(float(samples.max()), 4),
+    }
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+    # Windows has no resource module: ask for the process's peak working set directly
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32 = ctypes.WinDLL("kernel32")
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        psapi = ctypes.WinDLL("psapi")
+        psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+        if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return None
+        return round(counters.PeakWorkingSetSize / (1024 * 1024), 1)
+    except Exception:
+        return None
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def synthetic_frames(count, width, height, seed=0):
+    # A bright figure-sized blob moving over a noisy background; cheap to generate, realistic to convert
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 64, (height, width, 3), dtype=np.uint8)
+    for i in range(count):
+        frame = background.copy()
+        cx = int(width * (0.5 + 0.3 * np.sin(i / 20.0)))
+        cv2.ellipse(frame, (cx, height // 2), (width // 10, height // 3), 0, 0, 360, (200, 180, 160), -1)
+        yield frame
+
+class SyntheticCapture:
+    # synthetic_frames() behind the VideoCapture.read(image) interface: frames are drawn into the
+    # buffer passed in, so the source itself doesn't allocate and only the pipeline is measured
+    def __init__(self, count, width, height, seed=0):
+        self.count = count
+        self.index = 0
+        self.background = np.random.default_rng(seed).integers(0, 64, (height, width, 3), dtype=np.uint8)
+
+    def read(self, image=None):
+        if self.index >= self.count:
+            return False, None
+        if image is None or image.shape != self.background.shape:
+            image = np.empty_like(self.background)
+        np.copyto(image, self.background)
+        height, width = image.shape[:2]
+        cx = int(width * (0.5 + 0.3 * np.sin(self.index / 20.0)))
+        cv2.ellipse(image, (cx, height // 2), (width // 10, height // 3), 0, 0, 360, (200, 180, 160), -1)
+        self.index += 1
+        return True, image
+
+def video_frames(path, limit=None):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video file {path}")
+    try:
+        count = 0
+        while limit is None or count < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            count += 1
+            yield frame
+    finally:
+        cap.release()
+
+def synthetic_landmarks(count, seed=0):
+    # Landmark stream whose elbow and knee angles sweep through both rep thresholds
+    rng = np.random.default_rng(seed)
+    frames = rng.random((count, NUM_LANDMARKS, 4)).astype(np.float32) * 0.01 + 0.5
+    frames[:, :, 3] = 1.0
+    phase = np.linspace(0, count / 15.0, count)
+    bend = (np.sin(phase) + 1) / 2  # 0 straight .. 1 fully bent
+    for first, mid, end in ((11, 13, 15), (23, 25, 27)):
+        frames[:, first, :2] = frames[:, mid, :2] + [0.0, -0.2]
+        frames[:, end, 0] = frames[:, mid, 0] + 0.2 * np.sin(np.pi * (1 - bend) * 0.95)
+        frames[:, end, 1] = frames[:, mid, 1] - 0.2 * np.cos(np.pi * (1 - bend) * 0.95)
+    return frames
+
+def _display_converter():
+    # The GUI's display path: scale into a DisplayBufferRing buffer and wrap it in a QImage
+    # without copying; None without PyQt5
+    try:
+        from PyQt5.QtGui import QImage
+    except ImportError:
+        return None
+    from frame_pipeline import DisplayBufferRing
+    display_buffers = DisplayBufferRing()
+
+    def convert(image):
+        buffer = display_buffers.acquire(image, DISPLAY_SIZE)
+        h, w, ch = buffer.shape
+        QImage(buffer.data, w, h, ch * w, QImage.Format_BGR888)
+        # Handed straight back, as if the GUI had already painted it
+        display_buffers.release()
+    return convert
+
+def benchmark_frames(frames, exercise, warmup=10, **detector_options):
+    # Runs frames through create_detector(...).process_frame, exactly as the app does, and reports
+    # the stage timers the detector records itself (instrumentation.metrics). Stage percentiles
+    # cover the last frames each stage ran on (the metrics window); counts cover the whole run.
+    from instrumentation import metrics
+    from movement_detector import create_detector
+
+    detector = create_detector(exercise, enable_sound=False, **detector_options)
+    convert = _display_converter()
+    was_enabled = metrics.enabled
+    metrics.enabled = True
+    totals = []
+    frame_shape = None
+    try:
+        for index, frame in enumerate(frames):
+            if index == warmup:
+                metrics.reset()
+            frame_shape = frame.shape
+            t0 = time.perf_counter()
+            image = detector.process_frame(frame)[0]
+            if convert:
+                with metrics.stage("qimage_conversion"):
+                    convert(image)
+            if index >= warmup:
+                totals.append(time.perf_counter() - t0)
+        snapshot = metrics.snapshot()
+    finally:
+        metrics.enabled = was_enabled
+        metrics.reset()
+        detector.close()
+
+    return {
+        "frames": len(totals),
+        "resolution": f"{frame_shape[1]}x{frame_shape[0]}" if frame_shape else None,
+        "fps": round(len(totals) / sum(totals), 2) if totals else 0.0,
+        "frame": percentile_summary(totals),
+        "stages": snapshot["stages"],
+        "counters": snapshot["counters"],
+    }
+
+def benchmark_landmarks(frames, exercise, repeat=5):
+    rule = RULES[exercise]
+    frames = np.asarray(frames)
+
+    # Per-frame path, as the live detectors run it
+    per_frame = []
+    counter, stage = 0, None
+    for landmarks in frames:
+        t0 = time.perf_counter()
+        angle = float(rule_angle(joint_angles(landmarks), rule))
+        counter, stage, _ = step(rule, counter, stage, angle)
+        per_frame.append(time.perf_counter() - t0)
+
+    # Whole-stream replay
+    replay_times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = count_reps(frames, rule)
+        replay_times.append(time.perf_counter() - t0)
+
+    return {
+        "frames": len(frames),
+        "reps": result.counter,
+        "per_frame_fps": round(len(per_frame) / sum(per_frame), 2) if per_frame else 0.0,
+        "per_frame": percentile_summary(per_frame),
+        "replay_ms": round(min(replay_times) * 1000, 4),
+        "replay_fps": round(len(frames) / min(replay_times), 2) if min(replay_times) else 0.0,
+    }
+
+def benchmark_memory(capture, exercise, warmup=30):
+    # Runs frames through process_frame, reusing each frame buffer for the next read like the live
+    # pipeline does, and measures Python/numpy allocations after warm-up. A peak above the warm-up
+    # baseline of less than one frame means no frame-sized buffer is allocated per frame.
+    from movement_detector import create_detector
+
+    detector = create_detector(exercise, enable_sound=False)
+    frame = None
+    tracemalloc.start()
+    try:
+        for _ in range(warmup):
+            ret, frame = capture.read(frame)
+            if not ret:
+                break
+            detector.process_frame(frame)
+        baseline, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        frames = 0
+        while True:
+            ret, next_frame = capture.read(frame)
+            if not ret:
+                break
+            frame = next_frame
+            detector.process_frame(frame)
+            frames += 1
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        detector.close()
+
+    frame_bytes = frame.nbytes if frame is not None else 0
+    return {
+        "frames": frames,
+        "resolution": f"{frame.shape[1]}x{frame.shape[0]}" if frame is not None else None,
+        "frame_kb": round(frame_bytes / 1024, 1),
+        "steady_state_peak_kb": round((peak - baseline) / 1024, 1),
+        "steady_state_peak_frames": round((peak - baseline) / frame_bytes, 3) if frame_bytes else None,
+        "growth_kb": round((current - baseline) / 1024, 1),
+    }
+
+def compare(results, baseline, threshold):
+    # Prints fps changes against a baseline run; returns True if any benchmark regressed past the threshold
+    regressed = False
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if not previous:
+            continue
+        for key in ("fps", "per_frame_fps", "replay_fps"):
+            if key not in current or not previous.get(key):
+                continue
+            change = (current[key] - previous[key]) / previous[key]
+            flag = ""
+            if change < -threshold:
+                flag = "  <-- REGRESSION"
+                regressed = True
+            print(f"{name}.{key}: {previous[key]} -> {current[key]} ({change:+.1%}){flag}")
+    return regressed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the per-frame movement detection pipeline.")
+    parser.add_argument("--synthetic", type=int, default=0, help="Number of synthetic frames to benchmark.")
+    parser.add_argument("--resolution", type=str, default="1280x720", help="Synthetic frame size, WIDTHxHEIGHT.")
+    parser.add_argument("--video", type=str, action="append", default=[], help="Recorded clip to benchmark.")
+    parser.add_argument("--max-frames", type=int, default=None, help="Limit frames read from each clip.")
+    parser.add_argument("--landmarks", type=str, action="append", default=[],
+                        help="Cached landmark fixture (.npy, shape (frames, 33, 4)).")
+    parser.add_argument("--synthetic-landmarks", type=int, default=0,
+                        help="Number of generated landmark frames to benchmark counting on.")
+    parser.add_argument("--memory", type=int, default=0,
+                        help="Number of synthetic frames (at --resolution) for the per-frame allocation benchmark.")
+    parser.add_argument("--exercise", type=str, default="pushup", choices=list(RULES))
+    parser.add_argument("--profile", type=str, default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                        help="Pose model performance profile for image sources.")
+    parser.add_argument("--roi", action="store_true", help="Image sources: run inference on a crop around the athlete.")
+    parser.add_argument("--target-fps", type=int, default=0, help="Frame rate for --roi and --adaptive-inference.")
+    parser.add_argument("--adaptive-inference", action="store_true",
+                        help="Image sources: run inference on keyframes only and predict landmarks in between.")
+    parser.add_argument("--motion-gate", action="store_true", help="Image sources: skip inference on static frames.")
+    parser.add_argument("--output", type=str, default="benchmark_results.json", help="Where to write the JSON results.")
+    parser.add_argument("--compare", type=str, default=None, help="Baseline JSON from an earlier revision.")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Relative fps drop reported as a regression with --compare.")
+    args = parser.parse_args(argv)
+
+    if not (args.synthetic or args.video or args.landmarks or args.synthetic_landmarks or args.memory):
+        parser.error("Nothing to benchmark: pass --synthetic, --video, --landmarks, --synthetic-landmarks or --memory.")
+
+    detector_options = dict(profile=args.profile, roi_tracking=args.roi, target_fps=args.target_fps,
+                            adaptive_inference=args.adaptive_inference, motion_gate=args.motion_gate)
+    benchmarks = {}
+    width, height = (int(v) for v in args.resolution.lower().split("x"))
+    if args.synthetic:
+        print(f"Benchmarking {args.synthetic} synthetic {width}x{height} frames...")
+        benchmarks[f"synthetic_{width}x{height}"] = benchmark_frames(
+            synthetic_frames(args.synthetic, width, height), args.exercise, **detector_options)
+    for path in args.video:
+        print(f"Benchmarking {path}...")
+        benchmarks[f"video:{os.path.basename(path)}"] = benchmark_frames(
+            video_frames(path, args.max_frames), args.exercise, **detector_options)
+    for path in args.landmarks:
+        print(f"Benchmarking landmark fixture {path}...")
+        benchmarks[f"landmarks:{os.path.basename(path)}"] = benchmark_landmarks(np.load(path, mmap_mode="r"), args.exercise)
+    if args.synthetic_landmarks:
+        print(f"Benchmarking {args.synthetic_landmarks} synthetic landmark frames...")
+        benchmarks["synthetic_landmarks"] = benchmark_landmarks(synthetic_landmarks(args.synthetic_landmarks), args.exercise)
+    if args.memory:
+        print(f"Benchmarking per-frame allocations over {args.memory} synthetic {width}x{height} frames...")
+        benchmarks[f"memory_{width}x{height}"] = benchmark_memory(SyntheticCapture(args.memory, width, height), args.exercise)
+
+    results = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "exercise": args.exercise,
+        "detector_options": detector_options,
+        "peak_rss_mb": peak_rss_mb(),
+        "benchmarks": benchmarks,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from exercise_registry import exercise_names
+from movement_detector import create_detector
+from pose_features import joint_angles
+from rep_counting import summarize_chunk, stitch_chunks
+
+# Analyses one long recording by splitting it into time chunks that are decoded and run through
+# the pose model concurrently, one worker process per chunk at a time. Workers only return each
+# frame's rule angle summarised per chunk (rep_counting.summarize_chunk); the rep state is then
+# stitched across chunk boundaries exactly as a sequential pass would carry it over those angles.
+#
+# The result is close to, but not guaranteed to equal, a sequential run over the whole file: each
+# chunk starts a fresh pose tracker after the seek, so its landmarks differ slightly from the ones a
+# tracker that had followed the whole video would produce. Each chunk decodes `overlap` frames before
+# its first counted frame to warm up tracking and landmark smoothing, which keeps the difference
+# small; a rep close to a chunk boundary can still be timed a few frames apart, and an angle that
+# barely crosses a threshold there can be counted differently.
+Chunk = namedtuple("Chunk", ["index", "warmup_start", "start", "end"])
+
+DEFAULT_OVERLAP_SECONDS = 2.0
+
+_worker_detector = None
+
+def plan_chunks(frame_count, chunks, overlap_frames):
+    # Splits [0, frame_count) into `chunks` contiguous ranges; the last one reads to the end of the file
+    chunks = max(1, min(chunks, frame_count // max(1, overlap_frames * 2) or 1))
+    bounds = np.linspace(0, frame_count, chunks + 1).astype(int).tolist()
+    planned = []
+    for index, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+        end = None if index == chunks - 1 else end
+        planned.append(Chunk(index, max(0, start - overlap_frames), start, end))
+    return planned
+
+def _init_worker(exercise):
+    global _worker_detector
+    # Parallelism comes from the pool; keep OpenCV from oversubscribing the cores
+    cv2.setNumThreads(1)
+    _worker_detector = create_detector(exercise, enable_sound=False, draw_landmarks=False)
+
+def analyze_chunk(args):
+    path, chunk = args
+    detector = _worker_detector
+    detector.reset()
+    rule = detector.rule
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video file {path}")
+    try:
+        if chunk.warmup_start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, chunk.warmup_start)
+            position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+            if position != chunk.warmup_start:
+                raise IOError(f"Seeking to frame {chunk.warmup_start} landed on frame {position}")
+
+        angles = []
+        index = chunk.warmup_start
+        while chunk.end is None or index < chunk.end:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            landmarks = detector.estimate_pose(frame)
+            if index >= chunk.start:
+                angles.append(joint_angles(landmarks, (rule.angle,))[0] if landmarks is not None else np.nan)
+            index += 1
+    finally:
+        cap.release()
+    return chunk.index, summarize_chunk(np.array(angles, dtype=np.float64), rule, chunk.start)
+
+def analyze_long_video(path, exercise, workers=None, chunks=None, overlap_seconds=DEFAULT_OVERLAP_SECONDS):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video file {path}")
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    workers = workers or os.cpu_count() or 1
+    overlap_frames = int(round(overlap_seconds * video_fps))
+    planned = plan_chunks(frame_count, chunks or workers, overlap_frames)
+    workers = max(1, min(workers, len(planned)))
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(exercise,)) as pool:
+        counted = []
+        for index, chunk_count in pool.imap_unordered(analyze_chunk, [(path, chunk) for chunk in planned]):
+            counted.append(chunk_count)
+            print(f"[{len(counted)}/{len(planned)}] chunk {index}: {chunk_count.frames} frames")
+    elapsed = time.perf_counter() - start
+
+    reps, _, rep_frames = stitch_chunks(counted)
+    frames = sum(chunk_count.frames for chunk_count in counted)
+    return {
+        "file": path,
+        "exercise": exercise,
+        "reps": reps,
+        "rep_timestamps": [round(frame / video_fps, 3) for frame in rep_frames.tolist()],
+        "frames": frames,
+        "video_seconds": round(frames / video_fps, 3),
+        "chunks": len(planned),
+        "workers": workers,
+        "overlap_frames": overlap_frames,
+        "wall_seconds": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed else 0.0,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyse one long workout recording in parallel chunks.")
+    parser.add_argument("video", help="Video file to analyse.")
+    parser.add_argument("--exercise", type=str, default="pushup", choices=exercise_names(),
+                        help="Exercise to count.")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of worker processes. Defaults to the number of CPU cores.")
+    parser.add_argument("--chunks", type=int, default=None,
+                        help="Number of chunks to split the video into. Defaults to the number of workers.")
+    parser.add_argument("--overlap", type=float, default=DEFAULT_OVERLAP_SECONDS,
+                        help="Seconds decoded before each chunk to warm up pose tracking.")
+    parser.add_argument("--report", type=str, default=None, help="Write the result as JSON to this path.")
+    args = parser.parse_args(argv)
+
+    try:
+        result = analyze_long_video(args.video, args.exercise, args.workers, args.chunks, args.overlap)
+    except IOError as e:
+        print(f"Error: {e}")
+        return
+
+    print(f"{result['file']}: {result['reps']} reps in {result['video_seconds']}s of video, "
+          f"{result['frames']} frames in {result['wall_seconds']}s ({result['fps']} fps) "
+          f"with {result['workers']} worker(s) over {result['chunks']} chunk(s).")
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(result, f, indent=2)
+        print(f"Report written to {args.report}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
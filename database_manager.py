@@ -1,83 +1,522 @@
+import argparse
+import atexit
+import os
+import queue
 import sqlite3
 import datetime
+import threading
+
+# Rollup periods: name -> SQL expression for the first day ("YYYY-MM-DD") of the period containing
+# a workout date. Weeks start on Monday.
+ROLLUP_PERIODS = {
+    "day": "date({0})",
+    "week": "date({0}, 'weekday 0', '-6 days')",
+    "month": "date({0}, 'start of month')",
+}
+
+# Per-period aggregates in workout_rollups, and how they combine across exercises and periods
+ROLLUP_METRICS = {
+    "workouts": "SUM",
+    "total_reps": "SUM",
+    "total_duration_seconds": "SUM",
+    "max_reps": "MAX",
+}
+
+def _rollup_rebuild_statements():
+    # Recomputes every rollup from the workouts table
+    statements = ["DELETE FROM workout_rollups"]
+    for period, period_start in ROLLUP_PERIODS.items():
+        statements.append(f"""
+            INSERT INTO workout_rollups (period, period_start, exercise_type, workouts, total_reps,
+                                         total_duration_seconds, max_reps)
+            SELECT '{period}', {period_start.format("date")}, exercise_type, COUNT(*), SUM(completed_reps),
+                   SUM(IFNULL(duration_seconds, 0)), MAX(completed_reps)
+            FROM workouts GROUP BY 2, 3
+        """)
+    return statements
+
+# Schema migrations, applied in order; PRAGMA user_version records how many have run.
+# Append new steps and never edit one that has shipped.
+MIGRATIONS = [
+    # 1: the original tables. IF NOT EXISTS adopts databases created before migrations existed.
+    """
+    CREATE TABLE IF NOT EXISTS workouts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        exercise_type TEXT NOT NULL,
+        completed_reps INTEGER NOT NULL,
+        duration_seconds INTEGER
+    );
+    CREATE TABLE IF NOT EXISTS achievements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        name TEXT NOT NULL UNIQUE
+    );
+    """,
+    # 2: history is listed newest first, optionally for one exercise
+    """
+    CREATE INDEX IF NOT EXISTS idx_workouts_date ON workouts (date);
+    CREATE INDEX IF NOT EXISTS idx_workouts_exercise_date ON workouts (exercise_type, date);
+    CREATE INDEX IF NOT EXISTS idx_achievements_date ON achievements (date);
+    """,
+    # 3: every sortable history column can be paged through an index (see WORKOUT_SORT_KEYS)
+    """
+    CREATE INDEX IF NOT EXISTS idx_workouts_exercise ON workouts (exercise_type);
+    CREATE INDEX IF NOT EXISTS idx_workouts_reps ON workouts (completed_reps);
+    CREATE INDEX IF NOT EXISTS idx_workouts_duration ON workouts (IFNULL(duration_seconds, -1));
+    """,
+    # 4: per-exercise daily/weekly/monthly totals, kept up to date by save_workout(), so totals and
+    # charts read a few hundred rollup rows instead of the whole history
+    """
+    CREATE TABLE IF NOT EXISTS workout_rollups (
+        period TEXT NOT NULL,
+        period_start TEXT NOT NULL,
+        exercise_type TEXT NOT NULL,
+        workouts INTEGER NOT NULL,
+        total_reps INTEGER NOT NULL,
+        total_duration_seconds INTEGER NOT NULL,
+        max_reps INTEGER NOT NULL,
+        PRIMARY KEY (period, exercise_type, period_start)
+    ) WITHOUT ROWID;
+    """ + ";".join(_rollup_rebuild_statements()),
+    # 5: running counters behind the achievement rules (achievement_engine.py), one row per
+    # exercise plus '*' for all exercises
+    """
+    CREATE TABLE IF NOT EXISTS achievement_counters (
+        scope TEXT PRIMARY KEY,
+        workouts INTEGER NOT NULL,
+        lifetime_reps INTEGER NOT NULL,
+        best_session_reps INTEGER NOT NULL,
+        best_reps_per_minute REAL NOT NULL,
+        current_streak INTEGER NOT NULL,
+        longest_streak INTEGER NOT NULL,
+        last_day TEXT
+    );
+    """,
+    # 6: per-rep records of each workout (rep_log.py). Times are seconds from the start of the workout.
+    """
+    CREATE TABLE IF NOT EXISTS reps (
+        workout_id INTEGER NOT NULL REFERENCES workouts (id),
+        rep INTEGER NOT NULL,
+        started_at REAL,
+        completed_at REAL NOT NULL,
+        min_angle REAL,
+        max_angle REAL,
+        PRIMARY KEY (workout_id, rep)
+    ) WITHOUT ROWID;
+    """,
+]
+
+ACHIEVEMENT_COUNTER_COLUMNS = ("workouts", "lifetime_reps", "best_session_reps", "best_reps_per_minute",
+                               "current_streak", "longest_streak", "last_day")
+
+# The streak after one more workout on excluded.last_day, as achievement_engine.update_counters()
+# computes it: unchanged for another workout the same day (or an earlier one), one longer the day
+# after the last workout, otherwise a new streak
+_NEXT_STREAK = """
+    CASE WHEN last_day IS NOT NULL AND excluded.last_day <= last_day THEN current_streak
+         WHEN last_day = date(excluded.last_day, '-1 day') THEN current_streak + 1
+         ELSE 1 END
+"""
+
+# Sort keys for paged queries: column name -> SQL expression. Keys must never be NULL, since
+# keyset pagination compares them, and each expression matches an index.
+WORKOUT_SORT_KEYS = {
+    "date": "date",
+    "exercise_type": "exercise_type",
+    "completed_reps": "completed_reps",
+    "duration_seconds": "IFNULL(duration_seconds, -1)",
+}
+ACHIEVEMENT_SORT_KEYS = {
+    "date": "date",
+    "name": "name",
+}
+
+# Marks the end of the write queue
+_STOP = object()
+
+# Statement parameter standing for the rowid inserted by the first statement of the same list,
+# e.g. to link child rows to the row that statement inserted
+INSERTED_ID = object()
+
+class _Database:
+    # The one write connection to a database file in this process, shared by every DatabaseManager
+    # (and thread) that opens it. Writes are queued and committed by a writer thread in batches,
+    # one transaction per batch, so callers never wait for the disk. Reads run on separate read
+    # connections: with WAL journaling they see the last committed state while a batch commits,
+    # so a read never waits for the writer (or for other processes, e.g. more stations).
+    def __init__(self, db_name, batch_size=256):
+        self.db_name = db_name
+        self.batch_size = batch_size
+        self.refs = 0
+        # Serialises use of the write connection
+        self.lock = threading.RLock()
+        # Idle read connections; each read borrows one, so threads can read concurrently
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        # timeout: wait for another process's write lock instead of failing
+        self.conn = sqlite3.connect(db_name, timeout=10.0, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        # Safe with WAL: a power cut can lose the last commits but never corrupts the database
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="DatabaseWriter", daemon=True)
+        self._writer.start()
+
+    def _migrate(self):
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            # executescript() commits first; the explicit transaction makes each step all-or-nothing
+            self.conn.executescript(f"BEGIN; {script}; PRAGMA user_version = {number}; COMMIT;")
+
+    def submit(self, sql, params, message=None, error_message="Error writing to database"):
+        # Queues one write; `message` is printed once it has been committed
+        self.submit_statements([(sql, params)], message, error_message)
+
+    def submit_statements(self, statements, message=None, error_message="Error writing to database"):
+        # Queues a list of (sql, params) that is committed all together or not at all.
+        # A list of parameter tuples runs the statement once per tuple with executemany().
+        self._queue.put((statements, message, error_message))
+
+    def flush(self):
+        # Blocks until every write queued so far has been committed
+        self._queue.join()
+
+    def execute(self, sql, params=(), flush=False):
+        # Runs a query on a read connection. It sees what has been committed, not writes still
+        # queued; flush=True first waits for those (read-your-writes, at the cost of waiting for the disk).
+        if flush:
+            self.flush()
+        if self.db_name == ":memory:":
+            # Every connection to ":memory:" is a database of its own: read through the write connection
+            with self.lock:
+                return self.conn.execute(sql, params).fetchall()
+        with self._readers_lock:
+            conn = self._readers.pop() if self._readers else None
+        if conn is None:
+            conn = sqlite3.connect(self.db_name, timeout=10.0, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+        try:
+            return conn.execute(sql, params).fetchall()
+        finally:
+            with self._readers_lock:
+                self._readers.append(conn)
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            # Everything queued meanwhile goes into the same transaction
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            for _ in range(len(batch) + stop):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _commit(self, batch):
+        with self.lock:
+            try:
+                with self.conn:
+                    for statements, _, _ in batch:
+                        self._execute_statements(statements)
+            except sqlite3.Error:
+                # One bad write mustn't lose the rest of the batch: retry them one at a time
+                for statements, _, error_message in batch:
+                    try:
+                        with self.conn:
+                            self._execute_statements(statements)
+                    except sqlite3.Error as e:
+                        print(f"{error_message}: {e}")
+                return
+        for _, message, _ in batch:
+            if message:
+                print(message)
+
+    def _execute_statements(self, statements):
+        inserted_id = None
+        for index, (sql, params) in enumerate(statements):
+            if isinstance(params, list):
+                if inserted_id is not None:
+                    params = [_bind_inserted_id(row, inserted_id) for row in params]
+                self.conn.executemany(sql, params)
+            else:
+                cursor = self.conn.execute(sql, _bind_inserted_id(params, inserted_id))
+                if index == 0:
+                    # Captured straight away: later inserts in the list change last_insert_rowid()
+                    inserted_id = cursor.lastrowid
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._writer.join()
+        with self._readers_lock:
+            readers, self._readers = self._readers, []
+        for conn in readers:
+            conn.close()
+        with self.lock:
+            self.conn.close()
+
+def _bind_inserted_id(params, inserted_id):
+    if inserted_id is None or INSERTED_ID not in params:
+        return params
+    return tuple(inserted_id if value is INSERTED_ID else value for value in params)
+
+_databases = {}
+_databases_lock = threading.Lock()
+
+def _database_key(db_name):
+    return db_name if db_name == ":memory:" else os.path.abspath(db_name)
+
+def _open_database(db_name):
+    with _databases_lock:
+        key = _database_key(db_name)
+        database = _databases.get(key)
+        if database is None:
+            database = _databases[key] = _Database(db_name)
+        database.refs += 1
+        return database
+
+def _release_database(database):
+    with _databases_lock:
+        database.refs -= 1
+        if database.refs > 0:
+            return
+        _databases.pop(_database_key(database.db_name), None)
+    database.close()
+
+@atexit.register
+def _close_databases():
+    # Commit whatever is still queued when the process exits
+    with _databases_lock:
+        databases = list(_databases.values())
+        _databases.clear()
+    for database in databases:
+        database.close()
 
 class DatabaseManager:
+    # A handle on the process-wide connection for db_name. Creating one is cheap and handles may be
+    # used from any thread; saves return immediately and are committed in the background. Queries
+    # never wait for saves and see the committed ones: call flush() first to read your own saves.
     def __init__(self, db_name="workout_history.db"):
         self.db_name = db_name
+        self._db = None
         self.conn = None
-        self.cursor = None
         self._connect()
-        self._create_table()
-        self._create_achievements_table()
 
     def _connect(self):
         try:
-            self.conn = sqlite3.connect(self.db_name)
-            self.cursor = self.conn.cursor()
+            self._db = _open_database(self.db_name)
+            self.conn = self._db.conn
         except sqlite3.Error as e:
             print(f"Database connection error: {e}")
 
-    def _create_table(self):
+    def save_workout(self, exercise_type, completed_reps, duration_seconds=None, date=None, reps=None):
+        # reps: optional per-rep records, tuples of rep_log.REP_FIELDS
         if self.conn:
+            date_str = (date or datetime.datetime.now()).strftime("%Y-%m-%d %H:%M:%S")
+            self._db.submit_statements(self._workout_statements(exercise_type, completed_reps, duration_seconds,
+                                                                date_str, reps),
+                                       f"Workout saved: {exercise_type}, {completed_reps} reps", "Error saving workout")
+
+    def save_workout_progress(self, exercise_type, completed_reps, duration_seconds, date, reps, scopes,
+                              reps_per_minute, unlocked):
+        # Saves a workout like save_workout() and, in the same transaction, advances the achievement
+        # counters of `scopes` by it and unlocks the achievement names in `unlocked`. The counters are
+        # incremented by the database, so concurrent saves from other processes add up.
+        if not self.conn:
+            return
+        date_str = date.strftime("%Y-%m-%d %H:%M:%S")
+        statements = self._workout_statements(exercise_type, completed_reps, duration_seconds, date_str, reps)
+        for scope in scopes:
+            statements.append((f"""
+                INSERT INTO achievement_counters (scope, {", ".join(ACHIEVEMENT_COUNTER_COLUMNS)})
+                VALUES (?, 1, ?, ?, ?, 1, 1, ?)
+                ON CONFLICT (scope) DO UPDATE SET
+                    workouts = workouts + 1,
+                    lifetime_reps = lifetime_reps + excluded.lifetime_reps,
+                    best_session_reps = MAX(best_session_reps, excluded.best_session_reps),
+                    best_reps_per_minute = MAX(best_reps_per_minute, excluded.best_reps_per_minute),
+                    current_streak = {_NEXT_STREAK},
+                    longest_streak = MAX(longest_streak, {_NEXT_STREAK}),
+                    last_day = MAX(IFNULL(last_day, ''), excluded.last_day)
+            """, (scope, completed_reps, completed_reps, reps_per_minute, date.date().isoformat())))
+        for name in unlocked:
+            statements.append(("INSERT OR IGNORE INTO achievements (date, name) VALUES (?, ?)", (date_str, name)))
+        message = "\n".join([f"Workout saved: {exercise_type}, {completed_reps} reps"] +
+                            [f"Achievement unlocked: {name}" for name in unlocked])
+        self._db.submit_statements(statements, message, "Error saving workout")
+
+    def _workout_statements(self, exercise_type, completed_reps, duration_seconds, date_str, reps):
+        statements = [("""
+            INSERT INTO workouts (date, exercise_type, completed_reps, duration_seconds)
+            VALUES (?, ?, ?, ?)
+        """, (date_str, exercise_type, completed_reps, duration_seconds))]
+        # The rollups are updated in the same transaction, so they always match the workouts
+        for period, period_start in ROLLUP_PERIODS.items():
+            statements.append((f"""
+                INSERT INTO workout_rollups (period, period_start, exercise_type, workouts, total_reps,
+                                             total_duration_seconds, max_reps)
+                VALUES (?, {period_start.format("?")}, ?, 1, ?, ?, ?)
+                ON CONFLICT (period, exercise_type, period_start) DO UPDATE SET
+                    workouts = workouts + 1,
+                    total_reps = total_reps + excluded.total_reps,
+                    total_duration_seconds = total_duration_seconds + excluded.total_duration_seconds,
+                    max_reps = MAX(max_reps, excluded.max_reps)
+            """, (period, date_str, exercise_type, completed_reps, duration_seconds or 0, completed_reps)))
+        if reps:
+            # Linked to the id the workout insert above was given
+            statements.append(("""
+                INSERT INTO reps (workout_id, rep, started_at, completed_at, min_angle, max_angle)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(INSERTED_ID,) + tuple(rep) for rep in reps]))
+        return statements
+
+    def save_achievement(self, name):
+        if self.conn:
+            date_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self._db.submit("""
+                INSERT OR IGNORE INTO achievements (date, name)
+                VALUES (?, ?)
+            """, (date_str, name), f"Achievement unlocked: {name}", "Error saving achievement")
+
+    def get_achievement_counters(self, scopes):
+        # scope -> tuple of ACHIEVEMENT_COUNTER_COLUMNS, for the scopes that have counters
+        if self.conn and scopes:
             try:
-                self.cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS workouts (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        date TEXT NOT NULL,
-                        exercise_type TEXT NOT NULL,
-                        completed_reps INTEGER NOT NULL,
-                        duration_seconds INTEGER
-                    )
-                """)
-                self.conn.commit()
+                rows = self._db.execute(f"""
+                    SELECT scope, {", ".join(ACHIEVEMENT_COUNTER_COLUMNS)} FROM achievement_counters
+                    WHERE scope IN ({", ".join("?" * len(scopes))})
+                """, tuple(scopes))
+                return {row[0]: row[1:] for row in rows}
             except sqlite3.Error as e:
-                print(f"Error creating table: {e}")
+                print(f"Error retrieving achievement counters: {e}")
+        return {}
 
-    def _create_achievements_table(self):
+    def get_achievement_names(self):
         if self.conn:
             try:
-                self.cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS achievements (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        date TEXT NOT NULL,
-                        name TEXT NOT NULL UNIQUE
-                    )
-                """)
-                self.conn.commit()
+                return {row[0] for row in self._db.execute("SELECT name FROM achievements")}
             except sqlite3.Error as e:
-                print(f"Error creating achievements table: {e}")
+                print(f"Error retrieving achievements: {e}")
+        return set()
+
+    def save_achievement_progress(self, counters, unlocked, replace=False):
+        # Writes achievement counters (scope -> tuple of ACHIEVEMENT_COUNTER_COLUMNS) and unlocks
+        # ("YYYY-MM-DD HH:MM:SS", name) in one transaction. replace=True drops every other counter row first.
+        if not self.conn:
+            return
+        statements = [("DELETE FROM achievement_counters", ())] if replace else []
+        for scope, values in counters.items():
+            statements.append((f"""
+                INSERT OR REPLACE INTO achievement_counters (scope, {", ".join(ACHIEVEMENT_COUNTER_COLUMNS)})
+                VALUES (?, {", ".join("?" * len(ACHIEVEMENT_COUNTER_COLUMNS))})
+            """, (scope,) + tuple(values)))
+        for date, name in unlocked:
+            statements.append(("INSERT OR IGNORE INTO achievements (date, name) VALUES (?, ?)", (date, name)))
+        message = "\n".join(f"Achievement unlocked: {name}" for _, name in unlocked)
+        self._db.submit_statements(statements, message, "Error saving achievement progress")
+
+    def flush(self):
+        # Waits until every save made so far has been committed, so queries that follow see them
+        if self.conn:
+            self._db.flush()
 
-    def save_workout(self, exercise_type, completed_reps, duration_seconds=None):
+    def get_workout_reps(self, workout_id):
+        # (rep, started_at, completed_at, min_angle, max_angle) of each recorded rep of a workout
         if self.conn:
             try:
-                date_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                self.cursor.execute("""
-                    INSERT INTO workouts (date, exercise_type, completed_reps, duration_seconds)
-                    VALUES (?, ?, ?, ?)
-                """, (date_str, exercise_type, completed_reps, duration_seconds))
-                self.conn.commit()
-                print(f"Workout saved: {exercise_type}, {completed_reps} reps")
+                return self._db.execute("""
+                    SELECT rep, started_at, completed_at, min_angle, max_angle FROM reps
+                    WHERE workout_id = ? ORDER BY rep
+                """, (workout_id,))
             except sqlite3.Error as e:
-                print(f"Error saving workout: {e}")
+                print(f"Error retrieving reps: {e}")
+        return []
 
-    def save_achievement(self, name):
+    def rebuild_rollups(self):
+        # Recomputes the rollup tables from scratch, e.g. after importing or editing workouts directly
+        if self.conn:
+            self._db.submit_statements([(sql, ()) for sql in _rollup_rebuild_statements()],
+                                       "Workout rollups rebuilt", "Error rebuilding workout rollups")
+            self._db.flush()
+
+    def get_time_series(self, metric="total_reps", period="day", exercise_type=None, date_from=None, date_to=None,
+                        max_points=200):
+        # (dates, values) of a rollup metric per period, oldest first, ready for plt.plot(dates, values).
+        # Without exercise_type, exercises are combined. Periods without workouts are left out.
+        # Longer series are down-sampled to at most max_points by splitting the dates into equal
+        # intervals of whole days and merging the periods in each; a point is dated by the start of
+        # its interval, so gaps between workouts keep their length. date_from/date_to are "YYYY-MM-DD" bounds.
+        if metric not in ROLLUP_METRICS:
+            raise ValueError(f"Unknown rollup metric '{metric}'")
+        if period not in ROLLUP_PERIODS:
+            raise ValueError(f"Unknown rollup period '{period}'")
+        aggregate = ROLLUP_METRICS[metric]
+        conditions, params = ["period = ?"], [period]
+        if exercise_type:
+            conditions.append("exercise_type = ?")
+            params.append(exercise_type)
+        if date_from:
+            conditions.append("period_start >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("period_start <= ?")
+            params.append(date_to)
+        rows = []
         if self.conn:
             try:
-                date_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                self.cursor.execute("""
-                    INSERT OR IGNORE INTO achievements (date, name)
-                    VALUES (?, ?)
-                """, (date_str, name))
-                self.conn.commit()
-                print(f"Achievement unlocked: {name}")
+                rows = self._db.execute(f"""
+                    SELECT period_start, {aggregate}({metric}) FROM workout_rollups
+                    WHERE {' AND '.join(conditions)}
+                    GROUP BY period_start ORDER BY period_start
+                """, params)
             except sqlite3.Error as e:
-                print(f"Error saving achievement: {e}")
+                print(f"Error retrieving workout time series: {e}")
+        dates = [datetime.date.fromisoformat(period_start) for period_start, _ in rows]
+        values = [value for _, value in rows]
+        max_points = max(1, max_points)
+        if len(rows) <= max_points:
+            return dates, values
+        combine = sum if aggregate == "SUM" else max
+        first = datetime.date.fromisoformat(date_from) if date_from else dates[0]
+        interval_days = -(-((dates[-1] - first).days + 1) // max_points)
+        buckets = {}
+        for date, value in zip(dates, values):
+            buckets.setdefault((date - first).days // interval_days, []).append(value)
+        return ([first + datetime.timedelta(days=bucket * interval_days) for bucket in buckets],
+                [combine(bucket_values) for bucket_values in buckets.values()])
+
+    def get_totals(self, exercise_type=None):
+        # Lifetime workouts, reps, duration and best session, from the monthly rollups
+        totals = dict.fromkeys(ROLLUP_METRICS, 0)
+        if self.conn:
+            columns = ", ".join(f"IFNULL({aggregate}({metric}), 0)" for metric, aggregate in ROLLUP_METRICS.items())
+            condition, params = ("AND exercise_type = ?", (exercise_type,)) if exercise_type else ("", ())
+            try:
+                rows = self._db.execute(f"SELECT {columns} FROM workout_rollups WHERE period = 'month' {condition}",
+                                        params)
+                totals = dict(zip(ROLLUP_METRICS, rows[0]))
+            except sqlite3.Error as e:
+                print(f"Error retrieving workout totals: {e}")
+        return totals
 
     def get_all_workouts(self):
         if self.conn:
             try:
-                self.cursor.execute("SELECT * FROM workouts ORDER BY date DESC")
-                return self.cursor.fetchall()
+                return self._db.execute("SELECT * FROM workouts ORDER BY date DESC, id DESC")
             except sqlite3.Error as e:
                 print(f"Error retrieving workouts: {e}")
         return []
@@ -85,24 +524,74 @@ class DatabaseManager:
     def get_all_achievements(self):
         if self.conn:
             try:
-                self.cursor.execute("SELECT * FROM achievements ORDER BY date DESC")
-                return self.cursor.fetchall()
+                return self._db.execute("SELECT * FROM achievements ORDER BY date DESC, id DESC")
             except sqlite3.Error as e:
                 print(f"Error retrieving achievements: {e}")
         return []
 
+    def get_workouts_page(self, limit, after=None, sort_column="date", descending=True, exercise_type=None,
+                          date_from=None, date_to=None):
+        # One page of workouts for a scrolling view. Each row is (id, date, exercise_type,
+        # completed_reps, duration_seconds, sort_key); pass (sort_key, id) of the last row as `after`
+        # to get the next page. date_from/date_to are inclusive "YYYY-MM-DD HH:MM:SS" bounds.
+        conditions, params = [], []
+        if exercise_type:
+            conditions.append("exercise_type = ?")
+            params.append(exercise_type)
+        return self._get_page("workouts", "id, date, exercise_type, completed_reps, duration_seconds",
+                              WORKOUT_SORT_KEYS[sort_column], limit, after, descending, date_from, date_to,
+                              conditions, params, "Error retrieving workouts")
+
+    def get_achievements_page(self, limit, after=None, sort_column="date", descending=True, date_from=None, date_to=None):
+        # Like get_workouts_page(); rows are (id, date, name, sort_key)
+        return self._get_page("achievements", "id, date, name", ACHIEVEMENT_SORT_KEYS[sort_column], limit, after,
+                              descending, date_from, date_to, [], [], "Error retrieving achievements")
+
+    def _get_page(self, table, columns, sort_key, limit, after, descending, date_from, date_to, conditions, params,
+                  error_message):
+        # Keyset pagination: rather than an OFFSET, which reads and discards every earlier row, each
+        # page continues from the (sort key, id) of the previous page's last row, so the index seek
+        # costs the same on page 1 and page 10000. id breaks ties between equal sort keys.
+        if not self.conn:
+            return []
+        conditions, params = list(conditions), list(params)
+        if date_from:
+            conditions.append("date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("date <= ?")
+            params.append(date_to)
+        if after is not None:
+            conditions.append(f"({sort_key}, id) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = "DESC" if descending else "ASC"
+        try:
+            return self._db.execute(f"""
+                SELECT {columns}, {sort_key} FROM {table} {where}
+                ORDER BY {sort_key} {direction}, id {direction} LIMIT ?
+            """, params + [limit])
+        except sqlite3.Error as e:
+            print(f"{error_message}: {e}")
+        return []
+
     def close(self):
+        # Releases this handle; the connection closes, after committing queued saves, with the last one
         if self.conn:
-            self.conn.close()
+            self.conn = None
+            _release_database(self._db)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Workout database maintenance.")
+    parser.add_argument("--db", type=str, default="workout_history.db", help="Database file.")
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="Recompute the daily/weekly/monthly rollups from the workouts table.")
+    args = parser.parse_args(argv)
+
+    db_manager = DatabaseManager(args.db)
+    if args.rebuild_rollups:
+        db_manager.rebuild_rollups()
+    db_manager.close()
 
 if __name__ == "__main__":
-    db_manager = DatabaseManager()
-    # Example usage:
-    # db_manager.save_workout("Pushup", 20, 120)
-    # db_manager.save_workout("Squat", 15)
-    
-    # workouts = db_manager.get_all_workouts()
-    # for workout in workouts:
-    #     print(workout)
-    
-    db_manager.close()
\ No newline at end of file
+    main()
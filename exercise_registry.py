@@ -0,0 +1,113 @@
+from collections import OrderedDict, namedtuple
+
+from pose_features import ANGLE_INDEX, LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP
+from rep_counting import PUSHUP_RULE, SQUAT_RULE, EVENT_NONE, EVENT_REP, step
+
+# Declarative exercise definitions. An exercise is its counting rule (the joint angle to track,
+# the thresholds and the down/up stage transitions, see rep_counting.CountingRule) plus the body
+# posture it is performed in. Adding an exercise is adding a definition; no detector code changes.
+ExerciseDefinition = namedtuple("ExerciseDefinition", ["name", "display_name", "rule", "posture"])
+
+# Torso orientation in the frame, from the shoulder-to-hip line
+POSTURE_HORIZONTAL = "horizontal"
+POSTURE_VERTICAL = "vertical"
+POSTURE_ANY = "any"
+
+# Pseudo-exercise that evaluates every registered exercise and counts whichever is being performed
+EXERCISE_AUTO = "auto"
+
+EXERCISES = OrderedDict()
+
+def register_exercise(definition):
+    EXERCISES[definition.name] = definition
+    return definition
+
+register_exercise(ExerciseDefinition("pushup", "Pushup", PUSHUP_RULE, POSTURE_HORIZONTAL))
+register_exercise(ExerciseDefinition("squat", "Squat", SQUAT_RULE, POSTURE_VERTICAL))
+
+def get_exercise(name):
+    # Looks up a definition by name or display name, case-insensitively; None if it isn't registered
+    name = name.lower()
+    for definition in EXERCISES.values():
+        if name in (definition.name, definition.display_name.lower()):
+            return definition
+    return None
+
+def exercise_names():
+    return list(EXERCISES)
+
+def torso_posture(landmarks, aspect_ratio=1.0):
+    # Horizontal when the shoulder-to-hip line is closer to horizontal than to vertical.
+    # aspect_ratio (width / height) turns normalized x and y into the same units.
+    shoulders = (landmarks[LEFT_SHOULDER, :2] + landmarks[RIGHT_SHOULDER, :2]) / 2
+    hips = (landmarks[LEFT_HIP, :2] + landmarks[RIGHT_HIP, :2]) / 2
+    dx = abs(float(hips[0] - shoulders[0])) * aspect_ratio
+    dy = abs(float(hips[1] - shoulders[1]))
+    return POSTURE_HORIZONTAL if dx > dy else POSTURE_VERTICAL
+
+class ExerciseEvaluator:
+    # Runs the rep state machine of every definition on the same joint-angle table, so one pose
+    # inference per frame serves all exercises; each extra exercise costs one table lookup and
+    # one step() per frame. Only definitions whose posture matches the frame advance.
+    #
+    # The exercise being performed is recognised from completed reps: the first exercise to count
+    # a rep becomes current, and another one takes over after `switch_reps` reps in a row without
+    # a rep of the current exercise. Every exercise keeps its own count, so a switch keeps the reps
+    # that led to it.
+    def __init__(self, definitions=None, switch_reps=2):
+        self.definitions = list(EXERCISES.values() if definitions is None else definitions)
+        self.switch_reps = switch_reps
+        self._angle_index = [ANGLE_INDEX[definition.rule.angle] for definition in self.definitions]
+        self.reset()
+
+    def reset(self):
+        count = len(self.definitions)
+        self.counters = [0] * count
+        self.stages = [None] * count
+        self.events = [EVENT_NONE] * count
+        self.angles = [float("nan")] * count # Angle each exercise stepped on in the last frame; NaN if it didn't
+        self._pending = [0] * count
+        self._current = None
+
+    @property
+    def current(self):
+        # Definition of the recognised exercise, or None until one has counted a rep
+        return None if self._current is None else self.definitions[self._current]
+
+    def state(self):
+        # (counter, stage, event) of the recognised exercise for the last frame
+        if self._current is None:
+            return 0, None, EVENT_NONE
+        i = self._current
+        return self.counters[i], self.stages[i], self.events[i]
+
+    def update(self, angles, posture):
+        # Advances every exercise on one frame's joint_angles() table; returns the recognised
+        # exercise's angle for this frame (None until one is recognised)
+        for i, definition in enumerate(self.definitions):
+            self.events[i] = EVENT_NONE
+            self.angles[i] = float("nan")
+            if definition.posture not in (POSTURE_ANY, posture):
+                continue
+            angle = float(angles[self._angle_index[i]])
+            if angle != angle: # NaN: the joint isn't visible
+                continue
+            self.angles[i] = angle
+            self.counters[i], self.stages[i], self.events[i] = step(definition.rule, self.counters[i],
+                                                                    self.stages[i], angle)
+            if self.events[i] == EVENT_REP:
+                self._on_rep(i)
+        if self._current is None:
+            return None
+        return float(angles[self._angle_index[self._current]])
+
+    def _on_rep(self, i):
+        if self._current is None:
+            self._current = i
+        elif i == self._current:
+            self._pending = [0] * len(self.definitions)
+        else:
+            self._pending[i] += 1
+            if self._pending[i] >= self.switch_reps:
+                self._current = i
+                self._pending = [0] * len(self.definitions)
@@ -0,0 +1,44 @@
+import threading
+
+import numpy as np
+
+# Reusable frame-sized arrays, so the per-frame path writes into existing memory (cv2 dst=
+# arguments, VideoCapture.read(image)) instead of allocating a new image for every frame.
+
+class BufferPool:
+    # Named scratch buffers for one owner (e.g. a detector's RGB conversion). get() returns the
+    # same array for a name until the requested shape changes, e.g. when the source resolution does.
+    def __init__(self):
+        self._buffers = {}
+        self.allocations = 0
+
+    def get(self, name, shape, dtype=np.uint8):
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.shape != shape or buffer.dtype != dtype:
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[name] = buffer
+            self.allocations += 1
+        # Consumers such as MediaPipe mark their input read-only; it's ours to write again now
+        buffer.flags.writeable = True
+        return buffer
+
+class FrameRecycler:
+    # Free list of captured frames handed back once nothing references them any more. The capture
+    # side passes acquire() to read(image), which decodes into it instead of allocating; whoever
+    # finishes with a frame last calls release(). Frames of a different size are simply dropped.
+    def __init__(self, max_free=8):
+        self.max_free = max_free
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        # A free frame, or None to let the reader allocate one
+        with self._lock:
+            return self._free.pop() if self._free else None
+
+    def release(self, frame):
+        if frame is None:
+            return
+        with self._lock:
+            if len(self._free) < self.max_free and (not self._free or self._free[0].shape == frame.shape):
+                self._free.append(frame)
@@ -0,0 +1,227 @@
+import threading
+import queue
+import time
+import logging
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+from instrumentation import metrics
+from frame_buffers import FrameRecycler
+
+# Drop policies for the bounded queues between pipeline stages.
+# "latest" discards the oldest queued frame when a stage falls behind, so a live
+# camera keeps reading at its native fps and inference always sees the newest frame.
+# "lossless" blocks the producer instead, so every frame of a video file is processed.
+DROP_LATEST = "latest"
+DROP_LOSSLESS = "lossless"
+DROP_AUTO = "auto"
+
+# Marks the end of the capture stream inside the queues
+_END_OF_STREAM = object()
+
+FrameResult = namedtuple("FrameResult", ["index", "captured_at", "image", "counter", "angle", "feedback"])
+
+def resolve_drop_policy(drop_policy, video_source_type):
+    if drop_policy in (DROP_LATEST, DROP_LOSSLESS):
+        return drop_policy
+    if drop_policy != DROP_AUTO:
+        logging.warning(f"Unknown drop policy '{drop_policy}', using '{DROP_AUTO}'")
+    return DROP_LATEST if video_source_type == "webcam" else DROP_LOSSLESS
+
+class FrameQueue:
+    def __init__(self, maxsize=2, drop_policy=DROP_LATEST, on_drop=None):
+        self.drop_policy = drop_policy
+        # Called with each item discarded by the latest policy, e.g. to recycle its frame
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max(1, maxsize))
+
+    def put(self, item, stop_event=None):
+        if self.drop_policy == DROP_LATEST and item is not _END_OF_STREAM:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return True
+                except queue.Full:
+                    try:
+                        dropped = self._queue.get_nowait()
+                        self.dropped += 1
+                        metrics.count("frames_dropped")
+                        if self.on_drop:
+                            self.on_drop(dropped)
+                    except queue.Empty:
+                        pass
+
+        # Lossless (and end-of-stream) puts wait for room, but give up once the pipeline is stopped
+        while stop_event is None or not stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(self, timeout=None):
+        # Raises queue.Empty on timeout
+        return self._queue.get(timeout=timeout)
+
+class DisplayBufferRing:
+    # Preallocated display-sized frame buffers, reused round-robin. The render stage scales each
+    # frame straight into the next buffer and wraps it without copying; the GUI must release a
+    # buffer (release()) before it can be written again, so at most size - 1 frames are in flight.
+    def __init__(self, size=3):
+        self.size = size
+        self._buffers = []
+        self._shape = None
+        self._next = 0
+        self._in_flight = 0
+        # Buffers replaced by a resize while frames in them were still queued to the GUI
+        self._retired = []
+        self._lock = threading.Lock()
+
+    def acquire(self, image, display_size):
+        # Scales `image` to fit display_size (width, height), keeping its aspect ratio, into the
+        # next free buffer. Returns the buffer, or None if the GUI still holds every buffer.
+        with self._lock:
+            if self._in_flight >= self.size - 1:
+                return None
+            self._in_flight += 1
+
+        h, w = image.shape[:2]
+        scale = min(display_size[0] / w, display_size[1] / h)
+        shape = (max(1, int(h * scale)), max(1, int(w * scale)), image.shape[2])
+        if shape != self._shape:
+            with self._lock:
+                # QImages queued to the GUI don't keep their numpy buffers alive; frames still in
+                # flight point into the old buffers, so keep those until the GUI has released them all
+                if self._in_flight > 1:
+                    self._retired.extend(self._buffers)
+            self._buffers = [np.empty(shape, dtype=np.uint8) for _ in range(self.size)]
+            self._shape = shape
+
+        buffer = self._buffers[self._next]
+        self._next = (self._next + 1) % self.size
+        if shape[:2] == (h, w):
+            np.copyto(buffer, image)
+        else:
+            cv2.resize(image, (shape[1], shape[0]), dst=buffer, interpolation=cv2.INTER_AREA)
+        return buffer
+
+    def release(self):
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if self._in_flight == 0:
+                self._retired = []
+
+class CaptureStage(threading.Thread):
+    def __init__(self, cap, output_queue, stop_event, recycler=None):
+        super().__init__(name="CaptureStage", daemon=True)
+        self.cap = cap
+        self.recycler = recycler
+        self.output_queue = output_queue
+        self.stop_event = stop_event
+        self.frames_read = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            with metrics.stage("capture"):
+                # Decode into a recycled frame when one is free
+                ret, frame = self.cap.read(self.recycler.acquire() if self.recycler else None)
+            if not ret:
+                logging.info("Capture stage reached end of stream.")
+                break
+            captured_at = time.perf_counter()
+            # The frame's own time when the source has one (video files), otherwise when it was captured
+            timestamp = getattr(self.cap, "timestamp", None)
+            self.output_queue.put((self.frames_read, captured_at, frame, captured_at if timestamp is None else timestamp),
+                                  self.stop_event)
+            self.frames_read += 1
+        self.output_queue.put(_END_OF_STREAM, self.stop_event)
+
+class InferenceStage(threading.Thread):
+    def __init__(self, detector, input_queue, output_queue, stop_event):
+        super().__init__(name="InferenceStage", daemon=True)
+        self.detector = detector
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.stop_event = stop_event
+        self.frames_processed = 0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            try:
+                item = self.input_queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _END_OF_STREAM:
+                break
+
+            index, captured_at, frame, timestamp = item
+            try:
+                image, counter, angle, feedback = self.detector.process_frame(frame, timestamp)
+            except Exception as e:
+                logging.error(f"Error processing frame {index}: {e}")
+                continue
+            self.frames_processed += 1
+            self.output_queue.put(FrameResult(index, captured_at, image, counter, angle, feedback), self.stop_event)
+        self.output_queue.put(_END_OF_STREAM, self.stop_event)
+
+class FramePipeline:
+    # Capture -> inference -> render, connected by bounded queues.
+    # The render/convert stage is whoever calls get_result() (VideoThread in the GUI), and hands
+    # each result's frame back with recycle() once done with it, so capture can decode into it again.
+    def __init__(self, cap, detector, drop_policy=DROP_LATEST, queue_size=2):
+        self.drop_policy = drop_policy
+        self._stop_event = threading.Event()
+        self._finished = False
+        # Enough free frames to cover every queue slot plus one per stage
+        self.recycler = FrameRecycler(2 * queue_size + 3)
+        self.frame_queue = FrameQueue(queue_size, drop_policy, lambda item: self.recycler.release(item[2]))
+        self.result_queue = FrameQueue(queue_size, drop_policy, lambda result: self.recycler.release(result.image))
+        self.capture_stage = CaptureStage(cap, self.frame_queue, self._stop_event, self.recycler)
+        self.inference_stage = InferenceStage(detector, self.frame_queue, self.result_queue, self._stop_event)
+        self.start_time = None
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self.inference_stage.start()
+        self.capture_stage.start()
+
+    def get_result(self, timeout=0.1):
+        # Returns the next FrameResult, or None on timeout / end of stream (see is_finished())
+        if self._finished:
+            return None
+        try:
+            item = self.result_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if item is _END_OF_STREAM:
+            self._finished = True
+            return None
+        return item
+
+    def is_finished(self):
+        return self._finished
+
+    def recycle(self, frame):
+        self.recycler.release(frame)
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        for stage in (self.capture_stage, self.inference_stage):
+            if stage.is_alive():
+                stage.join(timeout)
+        logging.info(f"Pipeline stopped: {self.stats()}")
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.start_time if self.start_time else 0.0
+        return {
+            "frames_read": self.capture_stage.frames_read,
+            "frames_processed": self.inference_stage.frames_processed,
+            "dropped_before_inference": self.frame_queue.dropped,
+            "dropped_before_render": self.result_queue.dropped,
+            "capture_fps": self.capture_stage.frames_read / elapsed if elapsed else 0.0,
+            "inference_fps": self.inference_stage.frames_processed / elapsed if elapsed else 0.0,
+        }
@@ -1,53 +1,145 @@
+import time
+# Startup timings (time-to-window, time-to-first-frame) are measured from here
+LAUNCH_TIME = time.perf_counter()
+
 import sys
-import cv2
 from database_manager import DatabaseManager
 import datetime
 import configparser
 import logging
 import os
 
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QComboBox, QLineEdit, QHBoxLayout, QDialog, QTableWidget, QTableWidgetItem, QFileDialog, QRadioButton, QButtonGroup
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLabel, QComboBox, QLineEdit, QHBoxLayout, QDialog, QTableView, QHeaderView, QDateEdit, QFileDialog, QRadioButton, QButtonGroup, QSizePolicy
+from PyQt5.QtCore import Qt, QDate, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QImage, QPixmap, QIntValidator
 
-from movement_detector import MovementDetector, SquatDetector
+from instrumentation import metrics, MetricsExporter, format_overlay, EXPORT_PROMETHEUS
+from pose_profile import DEFAULT_PROFILE, PROFILES, MIN_MODEL_COMPLEXITY, MAX_MODEL_COMPLEXITY
+from history_model import WorkoutHistoryModel, AchievementsModel
+from achievement_engine import get_achievement_engine
+
+# cv2, mediapipe, numpy and the audio backend are slow to import, so they are only imported
+# where they're used (mostly on PreloadThread, once the window is already showing)
 
 # Set up logging
 log_file = "application.log"
 logging.basicConfig(filename=log_file, level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
+def _performance_option(config, read, option, fallback, is_valid=None):
+    # A blank value means unset; an unreadable or out-of-range one is logged and replaced by the
+    # default, since settings.ini is edited by hand and a typo shouldn't stop workouts from starting
+    if not config.get("Performance", option, fallback="").strip():
+        return fallback
+    try:
+        value = read("Performance", option)
+    except ValueError:
+        value = None
+    if value is None or (is_valid and not is_valid(value)):
+        logging.warning(f"Invalid [Performance] {option} = '{config.get('Performance', option)}' in settings, "
+                        f"using {fallback!r}")
+        return fallback
+    return value
+
+def load_performance_options(config):
+    # Optional [Performance] section of settings.ini
+    def non_negative(value):
+        return value >= 0
+    return {
+        "roi_tracking": _performance_option(config, config.getboolean, "roi_tracking", False),
+        "target_fps": _performance_option(config, config.getint, "target_fps", 0, non_negative),
+        "adaptive_inference": _performance_option(config, config.getboolean, "adaptive_inference", False),
+        "max_inference_interval": _performance_option(config, config.getint, "max_inference_interval", 4,
+                                                      lambda value: value >= 1),
+        "motion_gate": _performance_option(config, config.getboolean, "motion_gate", False),
+        # Pose model profile; the individual options override the profile's values when set
+        "profile": _performance_option(config, config.get, "profile", DEFAULT_PROFILE,
+                                       lambda value: value in PROFILES),
+        "model_complexity": _performance_option(config, config.getint, "model_complexity", None,
+                                                lambda value: MIN_MODEL_COMPLEXITY <= value <= MAX_MODEL_COMPLEXITY),
+        "smooth_landmarks": _performance_option(config, config.getboolean, "smooth_landmarks", None),
+        "enable_segmentation": _performance_option(config, config.getboolean, "enable_segmentation", None),
+        "input_size": _performance_option(config, config.getint, "input_size", None, non_negative),
+    }
+
+# Stage order for the on-screen stats overlay, following a frame through the pipeline
+OVERLAY_STAGES = ("capture", "motion_gate", "resize", "color_conversion", "inference", "counting", "drawing",
+                  "qimage_conversion", "signal_emit", "signal_delivery", "capture_to_display")
+
+class PreloadThread(QThread):
+    # Imports the heavy modules, decodes the audio cues, loads the pose model and opens the video
+    # source in the background while the user is still picking an exercise
+    preload_finished_signal = pyqtSignal(float) # seconds taken
+
+    def __init__(self, video_source_type, video_source_path, playback, performance_options=None, warm_models=True):
+        super().__init__()
+        self.video_source_type = video_source_type
+        self.video_source_path = video_source_path
+        self.playback = playback
+        self.performance_options = performance_options or {}
+        self.warm_models = warm_models
+        self.capture = None
+
+    def run(self):
+        started = time.perf_counter()
+        try:
+            if self.warm_models:
+                from audio_engine import get_audio_engine
+                from pose_pool import get_pose_pool
+                from pose_profile import profile_from_options, pose_settings_for
+                import frame_pipeline # Loads cv2 and numpy ahead of the first workout
+                import movement_detector
+                get_audio_engine()
+                get_pose_pool().warm(pose_settings_for(profile_from_options(self.performance_options)))
+            from video_source import open_video_source
+            self.capture = open_video_source(self.video_source_type, self.video_source_path, self.playback)
+        except Exception as e:
+            logging.error(f"Error preloading: {e}")
+        self.preload_finished_signal.emit(time.perf_counter() - started)
+
 class VideoThread(QThread):
     change_pixmap_signal = pyqtSignal(QImage)
-    update_counter_signal = pyqtSignal(int, str)
-    update_feedback_signal = pyqtSignal(str)
+    update_state_signal = pyqtSignal(int, str, str) # counter, exercise_type, feedback; sent only on change
     workout_completed_signal = pyqtSignal(str, int) # exercise_type, completed_reps
+    fps_signal = pyqtSignal(float) # processed frames per second, about once a second
+    achievement_unlocked_signal = pyqtSignal(str) # achievement name, after the workout is saved
 
-    def __init__(self, exercise_type, target_reps, db_name, video_source_type, video_source_path):
+    def __init__(self, exercise_type, target_reps, db_name, video_source_type, video_source_path, drop_policy=None, queue_size=2,
+                 performance_options=None, capture=None, playback=None):
         super().__init__()
+        from frame_pipeline import DisplayBufferRing, resolve_drop_policy, DROP_AUTO
+        from movement_detector import create_detector
+
         self._run_flag = True
         self.exercise_type = exercise_type
         self.target_reps = target_reps
         self.db_name = db_name # Pass db_name instead of db_manager
         self.video_source_type = video_source_type
         self.video_source_path = video_source_path
+        self.playback = playback
+        self.drop_policy = resolve_drop_policy(drop_policy or DROP_AUTO, video_source_type)
+        self.queue_size = queue_size
+        self.performance_options = performance_options or {}
         self.start_time = None
-
-        # Create DatabaseManager instance within the thread
-        self.db_manager = DatabaseManager(self.db_name)
-
-        if self.exercise_type == "Pushup":
-            self.detector = MovementDetector()
-        elif self.exercise_type == "Squat":
-            self.detector = SquatDetector()
-        else:
-            self.detector = MovementDetector() # Default
+        # Video source already opened by PreloadThread, if any
+        self.capture = capture
+        # (captured_at, emitted_at) of the last frame sent to the GUI, for delivery latency metrics
+        self.last_frame_times = None
+        # Frames are scaled once, straight to the video widget's size, into reused buffers
+        self.display_size = (640, 480)
+        self.display_buffers = DisplayBufferRing()
+
+        # Unknown exercise types fall back to the pushup detector; "Auto" recognises the exercise being performed.
+        # The detector borrows a warm Pose model from the pool and returns it when the workout ends.
+        self.detector = create_detector(self.exercise_type, **self.performance_options)
 
     def run(self):
-        if self.video_source_type == "webcam":
-            cap = cv2.VideoCapture(0) # Webcam
-        else:
-            cap = cv2.VideoCapture(self.video_source_path) # Video file
+        from frame_pipeline import FramePipeline
+        from video_source import open_video_source, PLAYBACK_MAX_THROUGHPUT
+
+        cap, self.capture = self.capture, None
+        if cap is None or not cap.isOpened():
+            cap = open_video_source(self.video_source_type, self.video_source_path, self.playback or PLAYBACK_MAX_THROUGHPUT)
 
         if not cap.isOpened():
             logging.error("Error: Could not open video source.")
@@ -56,41 +148,99 @@ class VideoThread(QThread):
 
         self.start_time = datetime.datetime.now()
 
-        while self._run_flag:
-            ret, frame = cap.read()
-            if ret:
-                image, counter, angle, feedback = self.detector.process_frame(frame)
-
-                # Convert image to PyQt format
-                h, w, ch = image.shape
-                bytes_per_line = ch * w
-                convert_to_Qt_format = QImage(image.data, w, h, bytes_per_line, QImage.Format_BGR888)
-                p = convert_to_Qt_format.scaled(640, 480, Qt.KeepAspectRatio)
-                self.change_pixmap_signal.emit(p)
-                self.update_counter_signal.emit(counter, self.exercise_type)
-                self.update_feedback_signal.emit(feedback)
-
-                if self.target_reps > 0 and counter >= self.target_reps:
-                    self.update_feedback_signal.emit(f"Congratulations! Target {self.target_reps} reached!")
-                    self.stop()
+        # Capture and inference run on their own threads; this thread is the render/convert stage
+        pipeline = FramePipeline(cap, self.detector, self.drop_policy, self.queue_size)
+        pipeline.start()
+        last_state = None
+        fps_window_start, fps_window_frames = time.perf_counter(), 0
 
+        while self._run_flag:
+            result = pipeline.get_result(timeout=0.1)
+            if result is None:
+                if pipeline.is_finished():
+                    break
+                continue
+
+            image, counter, feedback = result.image, result.counter, result.feedback
+
+            fps_window_frames += 1
+            now = time.perf_counter()
+            if now - fps_window_start >= 1.0:
+                fps = fps_window_frames / (now - fps_window_start)
+                metrics.gauge("processed_fps", fps)
+                self.fps_signal.emit(fps)
+                fps_window_start, fps_window_frames = now, 0
+
+            # Scale into a preallocated display buffer and wrap it for Qt without copying.
+            # If the GUI still holds every buffer, skip displaying this frame rather than queue it.
+            with metrics.stage("qimage_conversion"):
+                buffer = self.display_buffers.acquire(image, self.display_size)
+                if buffer is not None:
+                    h, w, ch = buffer.shape
+                    qt_image = QImage(buffer.data, w, h, ch * w, QImage.Format_BGR888)
+            # The display buffer holds its own copy; capture can decode into this frame again
+            pipeline.recycle(image)
+            with metrics.stage("signal_emit"):
+                if buffer is not None:
+                    self.last_frame_times = (result.captured_at, time.perf_counter())
+                    self.change_pixmap_signal.emit(qt_image)
+                else:
+                    metrics.count("frames_not_displayed")
+                exercise_name = self.exercise_name()
+                if (counter, exercise_name, feedback) != last_state:
+                    self.update_state_signal.emit(counter, exercise_name, feedback)
+                    last_state = (counter, exercise_name, feedback)
+
+            if self.target_reps > 0 and counter >= self.target_reps:
+                self.update_state_signal.emit(counter, self.exercise_name(), f"Congratulations! Target {self.target_reps} reached!")
+                self.stop()
+
+        pipeline.stop()
+        if getattr(cap, "frames_skipped", 0):
+            logging.info(f"Paced playback skipped {cap.frames_skipped} late frames")
         cap.release()
+        self.detector.close()
         self._save_workout_data()
-        self.workout_completed_signal.emit(self.exercise_type, self.detector.counter)
+        self.workout_completed_signal.emit(self.exercise_name(), self.detector.counter)
+
+    def exercise_name(self):
+        # The selected exercise, or with "Auto" the recognised one (the selection until one is recognised)
+        exercise = getattr(self.detector, "exercise", None)
+        return exercise.display_name if exercise is not None else self.exercise_type
 
     def stop(self):
         self._run_flag = False
         self.wait()
 
+    def set_display_size(self, width, height):
+        self.display_size = (max(1, width), max(1, height))
+
+    def frame_displayed(self):
+        # Called by the GUI once it has copied a frame out of its display buffer
+        self.display_buffers.release()
+
     def _save_workout_data(self):
+        from exercise_registry import EXERCISE_AUTO
         if self.start_time:
+            if self.exercise_type.lower() == EXERCISE_AUTO and self.detector.exercise is None:
+                logging.info("No exercise recognised; workout not saved")
+                return
             end_time = datetime.datetime.now()
             duration = (end_time - self.start_time).total_seconds()
+            # A handle on the shared connection; the save is queued and committed in the background
+            db_manager = DatabaseManager(self.db_name)
             try:
-                self.db_manager.save_workout(self.exercise_type, self.detector.counter, int(duration))
-                logging.info(f"Workout saved: {self.exercise_type}, {self.detector.counter} reps, {int(duration)} seconds")
+                exercise_name = self.exercise_name()
+                # The rep log is written with one executemany, in the workout's transaction
+                unlocked = get_achievement_engine().record_workout(db_manager, exercise_name, self.detector.counter,
+                                                                   int(duration), self.detector.rep_log.records())
+                logging.info(f"Workout saved: {exercise_name}, {self.detector.counter} reps, {int(duration)} seconds")
+                for name in unlocked:
+                    self.achievement_unlocked_signal.emit(name)
             except Exception as e:
                 logging.error(f"Error saving workout data: {e}")
+            finally:
+                db_manager.close()
 
 class PushupCounterApp(QWidget):
     def __init__(self):
@@ -103,7 +253,81 @@ class PushupCounterApp(QWidget):
         self.load_app_settings()
         self.db_name = "workout_history.db" # Define db_name here
         self.db_manager = DatabaseManager(self.db_name) # Initialize db_manager here
+        self.metrics_exporter = None
+        self.preload_thread = None
+        # warm_models of a preload requested while another was running; it starts when that one finishes
+        self.pending_preload = None
+        self.workout_started_at = None
+        self.first_frame_reported = False
         self.initUI()
+        self.setup_instrumentation()
+        # Runs once the event loop has shown the window
+        QTimer.singleShot(0, self.on_window_shown)
+
+    def on_window_shown(self):
+        time_to_window = time.perf_counter() - LAUNCH_TIME
+        metrics.record("startup_time_to_window", time_to_window)
+        logging.info(f"Startup: window shown after {time_to_window:.3f} s")
+        self.populate_exercises()
+        # Load everything a workout needs in the background while the user picks an exercise
+        self.start_preload()
+
+    def populate_exercises(self):
+        # The registry imports numpy, which would otherwise delay the window; the preload needs it anyway
+        from exercise_registry import EXERCISES, EXERCISE_AUTO
+        for definition in EXERCISES.values():
+            self.exercise_combo.addItem(definition.display_name)
+        self.exercise_combo.addItem(EXERCISE_AUTO.capitalize()) # Recognises the exercise being performed
+
+    def start_preload(self, warm_models=True):
+        # A workout can start once the preload thread has finished (on_preload_thread_finished), so
+        # starting one never waits for the preload on the GUI thread
+        self.start_button.setEnabled(False)
+        if self.preload_thread is not None and self.preload_thread.isRunning():
+            self.pending_preload = warm_models or bool(self.pending_preload)
+            return
+        self.release_preloaded_capture()
+        self.preload_thread = PreloadThread(self.config["VideoSource"]["type"], self.config["VideoSource"]["path"],
+                                            self.playback_mode(), load_performance_options(self.config), warm_models)
+        self.preload_thread.preload_finished_signal.connect(self.on_preload_finished)
+        self.preload_thread.finished.connect(self.on_preload_thread_finished)
+        self.preload_thread.start()
+
+    def on_preload_finished(self, seconds):
+        logging.info(f"Startup: preload finished in {seconds:.3f} s ({time.perf_counter() - LAUNCH_TIME:.3f} s after launch)")
+
+    def on_preload_thread_finished(self):
+        if self.pending_preload is not None:
+            # The settings changed while preloading: open the source they name instead
+            warm_models, self.pending_preload = self.pending_preload, None
+            self.start_preload(warm_models)
+            return
+        self.start_button.setText("Start Workout")
+        self.start_button.setEnabled(True)
+
+    def playback_mode(self):
+        # "max" (analyse as fast as possible) or "paced" (play in real time) for video files
+        return self.config.get("VideoSource", "playback", fallback="max")
+
+    def take_preloaded_capture(self, video_source_type, video_source_path, playback):
+        # The finished preload's opened capture, if it is for the given source
+        preload = self.preload_thread
+        if preload is None or not preload.isFinished():
+            return None
+        capture, preload.capture = preload.capture, None
+        if capture is not None and ((preload.video_source_type, preload.video_source_path, preload.playback)
+                                    != (video_source_type, video_source_path, playback)):
+            capture.release()
+            capture = None
+        return capture
+
+    def release_preloaded_capture(self):
+        # Only called with no preload running, or at exit
+        if self.preload_thread is not None:
+            self.preload_thread.wait()
+            capture, self.preload_thread.capture = self.preload_thread.capture, None
+            if capture is not None:
+                capture.release()
 
     def load_app_settings(self):
         self.config.read(self.settings_file)
@@ -113,6 +337,30 @@ class PushupCounterApp(QWidget):
             self.config["VideoSource"]["path"] = ""
             self.save_app_settings()
 
+    def setup_instrumentation(self):
+        # Optional [Instrumentation] section of settings.ini; everything stays off (and free) by default
+        metrics.enabled = self.config.getboolean("Instrumentation", "enabled", fallback=False)
+        if not metrics.enabled:
+            return
+
+        if self.config.getboolean("Instrumentation", "overlay", fallback=True):
+            self.stats_label.show()
+            self.stats_timer = QTimer(self)
+            self.stats_timer.timeout.connect(self.update_stats_overlay)
+            self.stats_timer.start(500)
+
+        export_path = self.config.get("Instrumentation", "export_path", fallback="")
+        if export_path:
+            self.metrics_exporter = MetricsExporter(
+                metrics, export_path,
+                self.config.get("Instrumentation", "export_format", fallback=EXPORT_PROMETHEUS),
+                self.config.getfloat("Instrumentation", "export_interval", fallback=5.0))
+            self.metrics_exporter.start()
+
+    def update_stats_overlay(self):
+        self.stats_label.setText(format_overlay(metrics.snapshot(), OVERLAY_STAGES) or "Waiting for frames...")
+        self.stats_label.adjustSize()
+
     def save_app_settings(self):
         with open(self.settings_file, "w") as configfile:
             self.config.write(configfile)
@@ -127,9 +375,8 @@ class PushupCounterApp(QWidget):
         exercise_group_layout = QVBoxLayout()
         self.exercise_label = QLabel("Select Exercise:")
         exercise_group_layout.addWidget(self.exercise_label)
+        # Filled from the exercise registry once the window is showing (populate_exercises)
         self.exercise_combo = QComboBox()
-        self.exercise_combo.addItem("Pushup")
-        self.exercise_combo.addItem("Squat")
         exercise_group_layout.addWidget(self.exercise_combo)
         control_layout.addLayout(exercise_group_layout)
 
@@ -158,6 +405,11 @@ class PushupCounterApp(QWidget):
         self.achievements_button.clicked.connect(self.show_achievements)
         control_layout.addWidget(self.achievements_button)
 
+        # Stations Button
+        self.stations_button = QPushButton("Stations")
+        self.stations_button.clicked.connect(self.show_stations)
+        control_layout.addWidget(self.stations_button)
+
         # Settings Button
         self.settings_button = QPushButton("Settings")
         self.settings_button.clicked.connect(self.show_settings)
@@ -168,9 +420,19 @@ class PushupCounterApp(QWidget):
         # Video Feed
         self.image_label = QLabel(self)
         self.image_label.resize(640, 480)
+        # Frames arrive pre-scaled to this label's size; don't let the pixmap drive the layout
+        self.image_label.setMinimumSize(320, 240)
+        self.image_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
         self.image_label.setAlignment(Qt.AlignCenter)
         self.image_label.setStyleSheet("background-color: black;")
-        main_layout.addWidget(self.image_label)
+        main_layout.addWidget(self.image_label, 1)
+
+        # Stats overlay, drawn over the top-left corner of the video feed when instrumentation is on
+        self.stats_label = QLabel(self.image_label)
+        self.stats_label.move(8, 8)
+        self.stats_label.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: #7CFC00; "
+                                       "font-family: monospace; font-size: 11px; padding: 4px;")
+        self.stats_label.hide()
 
         # Real-time Feedback
         self.counter_label = QLabel("Reps: 0")
@@ -183,6 +445,11 @@ class PushupCounterApp(QWidget):
         self.feedback_label.setStyleSheet("font-size: 24px; color: red;")
         main_layout.addWidget(self.feedback_label)
 
+        self.fps_label = QLabel("")
+        self.fps_label.setAlignment(Qt.AlignRight)
+        self.fps_label.setStyleSheet("color: gray;")
+        main_layout.addWidget(self.fps_label)
+
         self.setLayout(main_layout)
 
     def start_workout(self):
@@ -197,17 +464,67 @@ class PushupCounterApp(QWidget):
 
         video_source_type = self.config["VideoSource"]["type"]
         video_source_path = self.config["VideoSource"]["path"]
-
-        self.thread = VideoThread(exercise_type, target_reps, self.db_manager.db_name, video_source_type, video_source_path)
+        drop_policy = self.config.get("Pipeline", "drop_policy", fallback=None)
+        queue_size = self.config.getint("Pipeline", "queue_size", fallback=2)
+
+        self.workout_started_at = time.perf_counter()
+        playback = self.playback_mode()
+        capture = self.take_preloaded_capture(video_source_type, video_source_path, playback)
+        self.thread = VideoThread(exercise_type, target_reps, self.db_manager.db_name, video_source_type, video_source_path,
+                                  drop_policy, queue_size, load_performance_options(self.config), capture, playback)
+        self.thread.set_display_size(self.image_label.width(), self.image_label.height())
         self.thread.change_pixmap_signal.connect(self.update_image)
-        self.thread.update_counter_signal.connect(self.update_counter)
-        self.thread.update_feedback_signal.connect(self.update_feedback)
-        self.thread.workout_completed_signal.connect(self.check_achievements)
+        self.thread.update_state_signal.connect(self.update_state)
+        self.thread.workout_completed_signal.connect(self.on_workout_completed)
+        self.thread.achievement_unlocked_signal.connect(self.on_achievement_unlocked)
+        self.thread.fps_signal.connect(self.update_fps)
         self.thread.start()
         self.start_button.setText("Stop Workout")
 
     def update_image(self, qt_image):
+        # qt_image points into the sending thread's display buffers; ignore frames still queued
+        # from a previous workout, whose buffers may already be gone
+        if self.sender() is not self.thread:
+            return
         self.image_label.setPixmap(QPixmap.fromImage(qt_image))
+        # The pixmap holds its own copy now; hand the display buffer back to the video thread
+        self.thread.frame_displayed()
+        if self.workout_started_at is not None:
+            self.report_first_frame()
+        if metrics.enabled and self.thread and self.thread.last_frame_times:
+            captured_at, emitted_at = self.thread.last_frame_times
+            now = time.perf_counter()
+            metrics.record("signal_delivery", now - emitted_at)
+            metrics.record("capture_to_display", now - captured_at)
+
+    def report_first_frame(self):
+        now = time.perf_counter()
+        time_to_frame = now - self.workout_started_at
+        self.workout_started_at = None
+        metrics.record("start_to_first_frame", time_to_frame)
+        message = f"First processed frame displayed {time_to_frame:.3f} s after Start"
+        if not self.first_frame_reported:
+            # Cold start: only the first workout after launch includes it
+            self.first_frame_reported = True
+            metrics.record("startup_time_to_first_frame", now - LAUNCH_TIME)
+            message += f" ({now - LAUNCH_TIME:.3f} s after launch)"
+        logging.info(message)
+
+    def on_workout_completed(self, exercise_type, completed_reps):
+        # Reopen the video source so the next workout starts straight away
+        self.start_preload(warm_models=False)
+
+    def update_fps(self, fps):
+        self.fps_label.setText(f"Processing: {fps:.1f} fps")
+
+    def update_state(self, count, exercise_name, feedback_text):
+        self.update_counter(count, exercise_name)
+        self.update_feedback(feedback_text)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.thread:
+            self.thread.set_display_size(self.image_label.width(), self.image_label.height())
 
     def update_counter(self, count, exercise_name):
         self.counter_label.setText(f'{exercise_name}: {count}')
@@ -215,31 +532,142 @@ class PushupCounterApp(QWidget):
     def update_feedback(self, feedback_text):
         self.feedback_label.setText(f"Feedback: {feedback_text}")
 
-    def check_achievements(self, exercise_type, completed_reps):
-        if exercise_type == "Pushup" and completed_reps >= 100:
-            try:
-                self.db_manager.save_achievement("First 100 Pushups!")
-                logging.info("Achievement unlocked: First 100 Pushups!")
-            except Exception as e:
-                logging.error(f"Error saving achievement: {e}")
+    def on_achievement_unlocked(self, name):
+        # Rules are evaluated by the achievement engine when the workout is saved
+        logging.info(f"Achievement unlocked: {name}")
+        self.update_feedback(f"Achievement unlocked: {name}")
 
     def closeEvent(self, event):
         if self.thread and self.thread.isRunning():
             self.thread.stop()
+        self.release_preloaded_capture()
         self.db_manager.close()
+        if self.preload_thread is not None:
+            # Only loaded once preloading has run
+            from audio_engine import get_audio_engine
+            from pose_pool import get_pose_pool
+            get_audio_engine().close()
+            get_pose_pool().close()
+        if self.metrics_exporter:
+            self.metrics_exporter.stop()
         event.accept()
 
     def show_history(self):
         history_dialog = HistoryDialog(self.db_name)
         history_dialog.exec_()
+        history_dialog.db_manager.close()
 
     def show_achievements(self):
         achievements_dialog = AchievementsDialog(self.db_name)
         achievements_dialog.exec_()
+        achievements_dialog.db_manager.close()
+
+    def show_stations(self):
+        stations_dialog = StationsDialog(self)
+        stations_dialog.exec_()
 
     def show_settings(self):
         settings_dialog = SettingsDialog(self)
-        settings_dialog.exec_()
+        if settings_dialog.exec_():
+            # Apply the new settings now, and reopen the (possibly different) video source in the background
+            self.load_app_settings()
+            if not (self.thread and self.thread.isRunning()):
+                self.start_preload(warm_models=False)
+
+class StationsDialog(QDialog):
+    # Runs several stations at once (station_manager.py), each in its own process, and shows their
+    # counts and feedback. Station messages are dispatched from a timer on the GUI thread.
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.setWindowTitle("Stations")
+        self.setGeometry(250, 250, 600, 300)
+        self.parent = parent
+        self.manager = None
+        self.status_labels = {}
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll_stations)
+        self.initUI()
+
+    def initUI(self):
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel("Stations as source,exercise[,target_reps[,name]], separated by ';'. "
+                                "A source is a webcam index or a video file path."))
+        self.stations_input = QLineEdit(self.parent.config.get("Stations", "stations", fallback=""))
+        self.stations_input.setPlaceholderText("e.g., 0,pushup,20,front; 1,squat,15,back")
+        layout.addWidget(self.stations_input)
+        self.start_button = QPushButton("Start Stations")
+        self.start_button.clicked.connect(self.toggle_stations)
+        layout.addWidget(self.start_button)
+        self.error_label = QLabel("")
+        self.error_label.setStyleSheet("color: red;")
+        layout.addWidget(self.error_label)
+        self.status_layout = QVBoxLayout()
+        layout.addLayout(self.status_layout)
+        layout.addStretch(1)
+        self.setLayout(layout)
+
+    def toggle_stations(self):
+        if self.manager:
+            self.stop_stations()
+            return
+        from station_manager import StationManager, parse_station
+        specs = [spec.strip() for spec in self.stations_input.text().split(";") if spec.strip()]
+        try:
+            stations = [parse_station(spec, i) for i, spec in enumerate(specs)]
+            if not stations:
+                raise ValueError("Enter at least one station")
+            manager = StationManager(stations, self.parent.db_name, load_performance_options(self.parent.config),
+                                     self.update_station_status)
+        except ValueError as e:
+            self.error_label.setText(str(e))
+            return
+        self.error_label.setText("")
+        if not self.parent.config.has_section("Stations"):
+            self.parent.config.add_section("Stations")
+        self.parent.config["Stations"]["stations"] = "; ".join(specs)
+        self.parent.save_app_settings()
+
+        for label in self.status_labels.values():
+            label.deleteLater()
+        self.status_labels = {}
+        for station in stations:
+            label = QLabel("")
+            label.setStyleSheet("font-size: 18px;")
+            self.status_layout.addWidget(label)
+            self.status_labels[station.name] = label
+        self.manager = manager
+        for status in manager.status.values():
+            self.update_station_status(status)
+        manager.start()
+        self.poll_timer.start(100)
+        self.stations_input.setEnabled(False)
+        self.start_button.setText("Stop Stations")
+
+    def poll_stations(self):
+        # Never blocks the GUI: takes whatever messages have arrived
+        self.manager.poll(0)
+        if self.manager.all_finished():
+            self.stop_stations()
+
+    def update_station_status(self, status):
+        from station_manager import format_status_line
+        text = format_status_line([status])
+        if status.feedback:
+            text += f" - {status.feedback}"
+        self.status_labels[status.name].setText(text)
+
+    def stop_stations(self):
+        self.poll_timer.stop()
+        manager, self.manager = self.manager, None
+        # Collects the final counts and saves the workouts
+        manager.stop()
+        self.stations_input.setEnabled(True)
+        self.start_button.setText("Start Stations")
+
+    def done(self, result):
+        if self.manager:
+            self.stop_stations()
+        super().done(result)
 
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
@@ -275,6 +703,12 @@ class SettingsDialog(QDialog):
         file_path_layout.addWidget(self.browse_button)
         layout.addLayout(file_path_layout)
 
+        # Playback mode for video files
+        self.playback_combo = QComboBox()
+        self.playback_combo.addItem("Analyse as fast as possible", "max")
+        self.playback_combo.addItem("Play in real time", "paced")
+        layout.addWidget(self.playback_combo)
+
         self.webcam_radio.toggled.connect(self.toggle_video_file_input)
         self.video_file_radio.toggled.connect(self.toggle_video_file_input)
 
@@ -297,6 +731,7 @@ class SettingsDialog(QDialog):
         enable = self.video_file_radio.isChecked()
         self.video_file_path_input.setEnabled(enable)
         self.browse_button.setEnabled(enable)
+        self.playback_combo.setEnabled(enable)
 
     def browse_video_file(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Video File", "", "Video Files (*.mp4 *.avi *.mov)")
@@ -322,6 +757,8 @@ class SettingsDialog(QDialog):
         else:
             self.video_file_radio.setChecked(True)
             self.video_file_path_input.setText(self.config["VideoSource"]["path"])
+        index = self.playback_combo.findData(self.config.get("VideoSource", "playback", fallback="max"))
+        self.playback_combo.setCurrentIndex(max(0, index))
         self.toggle_video_file_input()
 
     def apply_settings(self):
@@ -331,6 +768,7 @@ class SettingsDialog(QDialog):
         else:
             self.config["VideoSource"]["type"] = "file"
             self.config["VideoSource"]["path"] = self.video_file_path_input.text()
+        self.config["VideoSource"]["playback"] = self.playback_combo.currentData()
         self.save_settings()
         self.accept()
 
@@ -344,32 +782,61 @@ class HistoryDialog(QDialog):
         self.initUI()
 
     def initUI(self):
+        from exercise_registry import EXERCISES
         layout = QVBoxLayout()
 
-        self.history_table = QTableWidget()
-        self.history_table.setColumnCount(4)
-        self.history_table.setHorizontalHeaderLabels(["Date", "Exercise Type", "Reps", "Duration (s)"])
+        # Filters; applied by the database, not to loaded rows
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("Exercise:"))
+        self.exercise_filter = QComboBox()
+        self.exercise_filter.addItem("All", None)
+        for definition in EXERCISES.values():
+            self.exercise_filter.addItem(definition.display_name, definition.display_name)
+        self.exercise_filter.currentIndexChanged.connect(self.apply_filters)
+        filter_layout.addWidget(self.exercise_filter)
+        filter_layout.addWidget(QLabel("From:"))
+        self.date_from_edit = self._create_date_edit()
+        filter_layout.addWidget(self.date_from_edit)
+        filter_layout.addWidget(QLabel("To:"))
+        self.date_to_edit = self._create_date_edit()
+        filter_layout.addWidget(self.date_to_edit)
+        layout.addLayout(filter_layout)
+
+        # Rows are fetched a page at a time as the table scrolls
+        self.history_model = WorkoutHistoryModel(self.db_manager, parent=self)
+        self.history_table = QTableView()
+        self.history_table.setModel(self.history_model)
+        self.history_table.setSortingEnabled(True)
+        self.history_table.sortByColumn(0, Qt.DescendingOrder)
+        self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(self.history_table)
 
-        self.load_history()
-
         self.setLayout(layout)
 
-    def load_history(self):
+    def _create_date_edit(self):
+        # The minimum date reads "Any" and leaves that end of the range open
+        date_edit = QDateEdit()
+        date_edit.setCalendarPopup(True)
+        date_edit.setDisplayFormat("yyyy-MM-dd")
+        date_edit.setMinimumDate(QDate(2000, 1, 1))
+        date_edit.setSpecialValueText("Any")
+        date_edit.setDate(date_edit.minimumDate())
+        date_edit.dateChanged.connect(self.apply_filters)
+        return date_edit
+
+    def _date_bound(self, date_edit, time_of_day):
+        if date_edit.date() == date_edit.minimumDate():
+            return None
+        return f"{date_edit.date().toString('yyyy-MM-dd')} {time_of_day}"
+
+    def apply_filters(self):
         try:
-            workouts = self.db_manager.get_all_workouts()
-            self.history_table.setRowCount(len(workouts))
-
-            for row_idx, workout in enumerate(workouts):
-                self.history_table.setItem(row_idx, 0, QTableWidgetItem(workout[1])) # Date
-                self.history_table.setItem(row_idx, 1, QTableWidgetItem(workout[2])) # Exercise Type
-                self.history_table.setItem(row_idx, 2, QTableWidgetItem(str(workout[3]))) # Completed Reps
-                self.history_table.setItem(row_idx, 3, QTableWidgetItem(str(workout[4]) if workout[4] is not None else "N/A")) # Duration
+            self.history_model.set_filters(exercise_type=self.exercise_filter.currentData(),
+                                           date_from=self._date_bound(self.date_from_edit, "00:00:00"),
+                                           date_to=self._date_bound(self.date_to_edit, "23:59:59"))
         except Exception as e:
             logging.error(f"Error loading workout history: {e}")
 
-        self.history_table.resizeColumnsToContents()
-
 class AchievementsDialog(QDialog):
     def __init__(self, db_name):
         super().__init__()
@@ -382,28 +849,16 @@ class AchievementsDialog(QDialog):
     def initUI(self):
         layout = QVBoxLayout()
 
-        self.achievements_list = QTableWidget()
-        self.achievements_list.setColumnCount(2)
-        self.achievements_list.setHorizontalHeaderLabels(["Date Unlocked", "Achievement"])        
+        self.achievements_model = AchievementsModel(self.db_manager, parent=self)
+        self.achievements_list = QTableView()
+        self.achievements_list.setModel(self.achievements_model)
+        self.achievements_list.setSortingEnabled(True)
+        self.achievements_list.sortByColumn(0, Qt.DescendingOrder)
+        self.achievements_list.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(self.achievements_list)
 
-        self.load_achievements()
-
         self.setLayout(layout)
 
-    def load_achievements(self):
-        try:
-            achievements = self.db_manager.get_all_achievements()
-            self.achievements_list.setRowCount(len(achievements))
-
-            for row_idx, achievement in enumerate(achievements):
-                self.achievements_list.setItem(row_idx, 0, QTableWidgetItem(achievement[1])) # Date
-                self.achievements_list.setItem(row_idx, 1, QTableWidgetItem(achievement[2])) # Name
-        except Exception as e:
-            logging.error(f"Error loading achievements: {e}")
-
-        self.achievements_list.resizeColumnsToContents()
-
 if __name__ == "__main__":
     # Redirect stdout and stderr to log file
     sys.stdout = open(log_file, 'a')
@@ -0,0 +1,110 @@
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+# Table models for the history and achievements views. Rows are loaded from the database a page
+# at a time as the view scrolls (canFetchMore/fetchMore), using the keyset-paginated queries in
+# DatabaseManager; sorting and filtering are done by the database, so opening a view reads one
+# page however long the history is.
+
+class PagedQueryModel(QAbstractTableModel):
+    # Subclasses set the headers, the database sort key of each column (None: not sortable) and
+    # implement fetch_page(). Rows end with their sort key; (sort key, id) of the last row is the
+    # keyset the next page continues from.
+    headers = ()
+    sort_keys = ()
+
+    def __init__(self, db_manager, page_size=200, parent=None):
+        super().__init__(parent)
+        self.db_manager = db_manager
+        self.page_size = page_size
+        self.sort_column = self.sort_keys[0]
+        self.descending = True
+        self.filters = {}
+        self._rows = []
+        self._has_more = True
+
+    def fetch_page(self, after):
+        raise NotImplementedError
+
+    def display(self, row, column):
+        raise NotImplementedError
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.display(self._rows[index.row()], index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._has_more:
+            return
+        after = (self._rows[-1][-1], self._rows[-1][0]) if self._rows else None
+        rows = self.fetch_page(after)
+        self._has_more = len(rows) == self.page_size
+        if rows:
+            self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+            self._rows.extend(rows)
+            self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        sort_column = self.sort_keys[column]
+        if sort_column is None:
+            return
+        self.sort_column = sort_column
+        self.descending = order == Qt.DescendingOrder
+        self.refresh()
+
+    def set_filters(self, **filters):
+        # Filter arguments of fetch_page(); None leaves a filter off
+        self.filters = {name: value for name, value in filters.items() if value is not None}
+        self.refresh()
+
+    def refresh(self):
+        # Drops the loaded rows and reads the first page again
+        self.beginResetModel()
+        self._rows = []
+        self._has_more = True
+        self.endResetModel()
+        self.fetchMore()
+
+class WorkoutHistoryModel(PagedQueryModel):
+    headers = ("Date", "Exercise Type", "Reps", "Duration (s)")
+    sort_keys = ("date", "exercise_type", "completed_reps", "duration_seconds")
+
+    def fetch_page(self, after):
+        return self.db_manager.get_workouts_page(self.page_size, after, self.sort_column, self.descending,
+                                                 **self.filters)
+
+    def display(self, row, column):
+        _, date, exercise_type, completed_reps, duration_seconds, _ = row
+        if column == 0:
+            return date
+        if column == 1:
+            return exercise_type
+        if column == 2:
+            return str(completed_reps)
+        return str(duration_seconds) if duration_seconds is not None else "N/A"
+
+class AchievementsModel(PagedQueryModel):
+    headers = ("Date Unlocked", "Achievement")
+    sort_keys = ("date", "name")
+
+    def fetch_page(self, after):
+        return self.db_manager.get_achievements_page(self.page_size, after, self.sort_column, self.descending,
+                                                     **self.filters)
+
+    def display(self, row, column):
+        _, date, name, _ = row
+        return date if column == 0 else name
@@ -0,0 +1,210 @@
+import bisect
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+
+# Hot-path instrumentation. Code under measurement does
+#
+#     with metrics.stage("inference"):
+#         ...
+#
+# When instrumentation is disabled, stage() returns a shared no-op context manager, so the
+# cost is one attribute check per call. When enabled, each stage keeps a rolling window of
+# recent timings (for percentiles / the on-screen overlay) and cumulative histogram buckets
+# (for Prometheus scraping).
+
+# Histogram bucket upper bounds in seconds
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+EXPORT_PROMETHEUS = "prometheus"
+EXPORT_JSON = "json"
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_NULL_TIMER = _NullTimer()
+
+class _StageTimer:
+    __slots__ = ("stats", "started")
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stats.record(time.perf_counter() - self.started)
+        return False
+
+class StageStats:
+    def __init__(self, window=512):
+        # Plain lists: scalar writes are much cheaper than into numpy arrays on the hot path
+        self.samples = [0.0] * window
+        self.position = 0
+        self.count = 0
+        self.total = 0.0
+        self.buckets = [0] * len(BUCKETS)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples[self.position] = seconds
+            self.position = (self.position + 1) % len(self.samples)
+            self.count += 1
+            self.total += seconds
+            # Buckets are stored non-cumulative and summed on export
+            index = bisect.bisect_left(BUCKETS, seconds)
+            if index < len(BUCKETS):
+                self.buckets[index] += 1
+
+    def summary(self):
+        # numpy is imported here so importing this module stays cheap at application startup
+        import numpy as np
+        with self._lock:
+            recent = np.array(self.samples[:min(self.count, len(self.samples))])
+            count, total = self.count, self.total
+        if len(recent) == 0:
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(recent, (50, 95, 99)) * 1000.0
+        return {
+            "count": count,
+            "mean_ms": round(float(recent.mean() * 1000.0), 3),
+            "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3),
+            "p99_ms": round(float(p99), 3),
+            "total_seconds": round(total, 3),
+        }
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.stages.setdefault(name, StageStats())
+        return stats
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _StageTimer(self._stats(name))
+
+    def record(self, name, seconds):
+        if self.enabled:
+            self._stats(name).record(seconds)
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, value):
+        # Current value of a level such as a ratio; replaces the previous value
+        if self.enabled:
+            self.gauges[name] = value
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+            self.gauges = {}
+
+    def snapshot(self):
+        return {
+            "stages": {name: stats.summary() for name, stats in list(self.stages.items())},
+            "counters": dict(self.counters),
+            "gauges": dict(self.gauges),
+        }
+
+    def to_prometheus(self, prefix="movement_coach"):
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent in each processing stage.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for name, stats in sorted(self.stages.items()):
+            with stats._lock:
+                cumulative = list(itertools.accumulate(stats.buckets))
+                count, total = stats.count, stats.total
+            for bound, value in zip(BUCKETS, cumulative):
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{bound}"}} {value}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {total}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {count}')
+        lines.append(f"# HELP {prefix}_events_total Counted pipeline events.")
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+        for name, value in sorted(self.gauges.items()):
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self):
+        data = self.snapshot()
+        data["timestamp"] = time.time()
+        return json.dumps(data, indent=2)
+
+def format_overlay(snapshot, stage_order=None):
+    # Compact multi-line text for the on-screen stats overlay
+    stages = snapshot["stages"]
+    names = [name for name in (stage_order or sorted(stages)) if name in stages]
+    lines = []
+    for name in names:
+        stats = stages[name]
+        if stats.get("count"):
+            lines.append(f"{name:<18} p50 {stats['p50_ms']:7.2f} ms  p95 {stats['p95_ms']:7.2f} ms")
+    for name, value in sorted(snapshot["counters"].items()):
+        lines.append(f"{name:<18} {value}")
+    for name, value in sorted(snapshot.get("gauges", {}).items()):
+        lines.append(f"{name:<18} {value:.2f}")
+    return "\n".join(lines)
+
+class MetricsExporter(threading.Thread):
+    # Periodically writes the metrics to a file for a monitoring agent to scrape
+    def __init__(self, metrics, path, export_format=EXPORT_PROMETHEUS, interval=5.0):
+        super().__init__(name="MetricsExporter", daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.export_format = export_format
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.export()
+
+    def export(self):
+        text = self.metrics.to_json() if self.export_format == EXPORT_JSON else self.metrics.to_prometheus()
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logging.error(f"Error exporting metrics to {self.path}: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        self.join(self.interval + 1.0)
+        self.export()
+
+# Shared instance used by the pipeline, detectors and GUI
+metrics = Metrics()
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from pose_features import NUM_LANDMARKS
+
+# Landmarks are cached per video as a (frames, 33, 4) float32 .npy file that is
+# memory-mapped on load, plus a small JSON sidecar with the frame rate.
+# Frames without a detected pose are stored as NaN rows.
+DEFAULT_CACHE_DIR = "landmark_cache"
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+def video_cache_key(video_path, pose_settings):
+    # Content hash of the video plus the Pose settings, so renamed copies share an entry
+    # and different confidence thresholds never do
+    digest = hashlib.blake2b(digest_size=20)
+    with open(video_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    digest.update(json.dumps(pose_settings, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+class LandmarkCacheWriter:
+    # Collects landmarks frame by frame while a video is processed the first time
+    def __init__(self, cache, key, fps, initial_frames=1024):
+        self.cache = cache
+        self.key = key
+        self.fps = fps
+        self.frame_count = 0
+        self._frames = np.full((max(1, initial_frames), NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+
+    def append(self, landmarks):
+        if self.frame_count == len(self._frames):
+            grown = np.full((len(self._frames) * 2, NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+            grown[:self.frame_count] = self._frames
+            self._frames = grown
+        if landmarks is not None:
+            self._frames[self.frame_count] = landmarks
+        self.frame_count += 1
+
+    def commit(self):
+        self.cache.store(self.key, self._frames[:self.frame_count], self.fps)
+
+class LandmarkCache:
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + ".npy", base + ".json"
+
+    def load(self, key):
+        # Returns (memory-mapped landmark array, fps), or (None, None) on a miss
+        data_path, meta_path = self._paths(key)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, None
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            frames = np.load(data_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            logging.warning(f"Discarding unreadable landmark cache entry {key}: {e}")
+            self._remove(key)
+            return None, None
+
+        # Touch the entry so eviction treats it as recently used
+        os.utime(data_path)
+        return frames, meta.get("fps", 0.0)
+
+    def writer(self, key, fps):
+        return LandmarkCacheWriter(self, key, fps)
+
+    def store(self, key, frames, fps):
+        data_path, meta_path = self._paths(key)
+        # Write to temporary files first so concurrent readers never see a partial entry
+        tmp_data_path = f"{data_path}.{os.getpid()}.tmp"
+        tmp_meta_path = f"{meta_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_data_path, "wb") as f:
+                np.save(f, np.ascontiguousarray(frames, dtype=np.float32))
+            with open(tmp_meta_path, "w") as f:
+                json.dump({"fps": fps, "frames": len(frames)}, f)
+            os.replace(tmp_meta_path, meta_path)
+            os.replace(tmp_data_path, data_path)
+        except OSError as e:
+            logging.error(f"Error writing landmark cache entry {key}: {e}")
+            for path in (tmp_data_path, tmp_meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            return
+        self.evict()
+
+    def _remove(self, key):
+        for path in self._paths(key):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evict(self):
+        # Least-recently-used eviction by data file mtime until the cache fits in max_bytes
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".npy"):
+                continue
+            key = name[:-len(".npy")]
+            size = 0
+            for path in self._paths(key):
+                if os.path.exists(path):
+                    size += os.path.getsize(path)
+            entries.append((os.path.getmtime(os.path.join(self.cache_dir, name)), key, size))
+            total += size
+
+        entries.sort()
+        for _, key, size in entries:
+            if total <= self.max_bytes:
+                break
+            logging.info(f"Evicting landmark cache entry {key} ({size} bytes)")
+            self._remove(key)
+            total -= size
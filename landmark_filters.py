@@ -0,0 +1,110 @@
+import math
+
+import numpy as np
+
+def _smoothing_factor(cutoff, dt):
+    # Works for a scalar cutoff or a per-coordinate array of cutoffs
+    r = 2 * math.pi * cutoff * dt
+    return r / (r + 1)
+
+class LandmarkOneEuroFilter:
+    # One-Euro filter over a whole (33, 4) landmark array at once: smooths x, y, z with a cutoff
+    # that rises with speed (little lag on fast moves, little jitter when still) and keeps the
+    # filtered velocity so landmarks can be predicted forward between model runs.
+    # Landmarks are normalized to the frame, so speeds are small and beta is correspondingly large.
+    def __init__(self, min_cutoff=3.0, beta=20.0, derivative_cutoff=1.0):
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.derivative_cutoff = derivative_cutoff
+        self.reset()
+
+    def reset(self):
+        self.value = None
+        self.velocity = None
+        self.visibility = None
+        self.time = None
+
+    def update(self, landmarks, t):
+        position = landmarks[:, :3].astype(np.float64)
+        if self.value is None or t <= self.time:
+            self.value = position
+            self.velocity = np.zeros_like(position)
+        else:
+            dt = t - self.time
+            raw_velocity = (position - self.value) / dt
+            a_d = _smoothing_factor(self.derivative_cutoff, dt)
+            self.velocity = a_d * raw_velocity + (1 - a_d) * self.velocity
+            a = _smoothing_factor(self.min_cutoff + self.beta * np.abs(self.velocity), dt)
+            self.value = a * position + (1 - a) * self.value
+        self.visibility = landmarks[:, 3].copy()
+        self.time = t
+        return self.current()
+
+    def predict(self, t, out=None):
+        # Constant-velocity extrapolation from the last filtered keyframe
+        if self.value is None:
+            return None
+        if out is None:
+            out = np.empty((len(self.value), 4), dtype=np.float32)
+        out[:, :3] = self.value + self.velocity * (t - self.time)
+        out[:, 3] = self.visibility
+        return out
+
+    def current(self):
+        return self.predict(self.time)
+
+class InferenceScheduler:
+    # Runs the pose model only on every Nth frame. N follows the measured inference latency so the
+    # average cost per frame fits the frame budget; frames in between get predicted landmarks.
+    # Time is measured in frames so the predicted signal is the same for live and recorded sources.
+    def __init__(self, target_fps=30, max_interval=4, filter=None):
+        self.target_fps = target_fps
+        self.max_interval = max_interval
+        self.filter = filter if filter is not None else LandmarkOneEuroFilter()
+        self.interval = 1
+        self.frame_index = -1
+        self.last_keyframe = None
+        self.latency = None
+        self.keyframes = 0
+        self.predicted_frames = 0
+
+    def reset(self):
+        self.filter.reset()
+        self.interval = 1
+        self.frame_index = -1
+        self.last_keyframe = None
+
+    def next_frame(self):
+        # Advances to the next frame; returns True when the model should run on it
+        self.frame_index += 1
+        if self.last_keyframe is None or self.filter.value is None:
+            return True
+        return self.frame_index - self.last_keyframe >= self.interval
+
+    def observe(self, landmarks, latency):
+        # Records a keyframe result (or None when no pose was found) and its inference latency in seconds
+        self.keyframes += 1
+        self.last_keyframe = self.frame_index
+        self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        budget = 1.0 / self.target_fps
+        self.interval = max(1, min(self.max_interval, math.ceil(self.latency / budget)))
+
+        if landmarks is None:
+            # Lost the pose: stop predicting until the model finds it again
+            self.filter.reset()
+            return None
+        return self.filter.update(landmarks, self.frame_index / self.target_fps)
+
+    def predict(self, out=None):
+        self.predicted_frames += 1
+        return self.filter.predict(self.frame_index / self.target_fps, out)
+
+    def stats(self):
+        total = self.keyframes + self.predicted_frames
+        return {
+            "interval": self.interval,
+            "keyframes": self.keyframes,
+            "predicted_frames": self.predicted_frames,
+            "inference_ratio": self.keyframes / total if total else 1.0,
+            "latency_ms": self.latency * 1000 if self.latency is not None else None,
+        }
@@ -2,66 +2,122 @@ import cv2
 import mediapipe as mp
 import numpy as np
 import argparse
-from movement_detector import MovementDetector, SquatDetector
-
-# --- Configuration ---
-# Set to True to use the webcam, False to use a video file.
-USE_WEBCAM = True
-# If USE_WEBCAM is False, specify the absolute path to your video file.
-VIDEO_PATH = r"C:\Users\slade\Documents\pushup_counter\pushup.mp4"
+import time
+from movement_detector import create_detector
+from pose_profile import PROFILES, DEFAULT_PROFILE
+from batch_analyzer import run_batch_cli, add_cache_arguments, cache_dir_from_args
+from exercise_registry import EXERCISE_AUTO, exercise_names, get_exercise
+from video_source import open_video_source, PLAYBACK_MODES, PLAYBACK_MAX_THROUGHPUT
 
 # --- Main Application Logic ---
 def main():
     parser = argparse.ArgumentParser(description="Movement counter for various exercises.")
-    parser.add_argument("--exercise", type=str, default="pushup",
-                        help="Specify the exercise to track: 'pushup' or 'squat'.")
+    parser.add_argument("--exercise", type=str, default="pushup", choices=exercise_names() + [EXERCISE_AUTO],
+                        help="Specify the exercise to track, or 'auto' to recognise it.")
     parser.add_argument("--target_reps", type=int, default=0,
                         help="Set a target number of repetitions for the exercise. 0 for no target.")
+    parser.add_argument("--source", type=str, default="0",
+                        help="Webcam index (e.g. 0) or path to a video file.")
+    parser.add_argument("--playback", type=str, default=PLAYBACK_MAX_THROUGHPUT, choices=PLAYBACK_MODES,
+                        help="Video files only: 'max' analyses as fast as possible with decoding prefetched on a "
+                             "separate thread; 'paced' plays in real time by the file's timestamps.")
+    parser.add_argument("--start", type=float, default=0.0,
+                        help="Video files only: start playback this many seconds in.")
+    parser.add_argument("--batch", type=str, nargs="+", default=None,
+                        help="Headless mode: analyse video files, directories or glob patterns and write a report.")
+    parser.add_argument("--report", type=str, default="batch_report.json",
+                        help="Batch report path (.json or .csv).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Number of batch worker processes. Defaults to the number of CPU cores.")
+    add_cache_arguments(parser)
+    parser.add_argument("--roi", action="store_true",
+                        help="Run pose inference on a crop around the athlete instead of the full frame.")
+    parser.add_argument("--target-fps", type=int, default=0,
+                        help="Frame rate to hold with --roi (inference resolution) and --adaptive-inference. 0 to disable.")
+    parser.add_argument("--adaptive-inference", action="store_true",
+                        help="Run pose inference only on every Nth frame, with N adapted to the inference latency, "
+                             "and predict landmarks in between.")
+    parser.add_argument("--max-inference-interval", type=int, default=4,
+                        help="Upper bound on N for --adaptive-inference.")
+    parser.add_argument("--motion-gate", action="store_true",
+                        help="Skip pose inference while the scene is static and reuse the last landmarks.")
+    parser.add_argument("--profile", type=str, default=DEFAULT_PROFILE, choices=sorted(PROFILES),
+                        help="Pose model performance profile. 'auto' adjusts the model complexity to hold --target-fps "
+                             "(30 if unset) during the first seconds.")
+    parser.add_argument("--model-complexity", type=int, default=None, choices=(0, 1, 2),
+                        help="Override the profile's pose model complexity: 0 = lite, 1 = full, 2 = heavy.")
+    parser.add_argument("--smooth-landmarks", action=argparse.BooleanOptionalAction, default=None,
+                        help="Override the profile's landmark smoothing.")
+    parser.add_argument("--segmentation", action=argparse.BooleanOptionalAction, default=None,
+                        help="Override whether the profile also computes a segmentation mask.")
+    parser.add_argument("--input-size", type=int, default=None,
+                        help="Override the profile's inference resolution (longest side in pixels, 0 for full frames).")
     args = parser.parse_args()
 
+    # --- Headless Batch Mode ---
+    if args.batch:
+        if args.exercise == EXERCISE_AUTO:
+            print("Error: Batch mode counts one exercise; please choose one of: " + ", ".join(exercise_names()) + ".")
+            return
+        run_batch_cli(args.batch, args.exercise, args.workers, args.report,
+                      cache_dir_from_args(args), args.cache_max_mb)
+        return
+
     # --- Video Capture Initialization ---
-    if USE_WEBCAM:
+    use_webcam = args.source.isdigit()
+    if use_webcam:
         print("Attempting to open webcam...")
-        cap = cv2.VideoCapture(0)  # 0 for default webcam
+        cap = open_video_source("webcam", args.source)
     else:
-        print(f"Attempting to open video file: {VIDEO_PATH}")
-        cap = cv2.VideoCapture(VIDEO_PATH) # Use the specified video file
+        print(f"Attempting to open video file: {args.source} ({args.playback} playback)")
+        cap = open_video_source("file", args.source, args.playback)
+        if args.start > 0 and cap.isOpened():
+            cap.seek(args.start)
 
     # Check if the video source was opened successfully.
     if not cap.isOpened():
         print("Error: Could not open video source. Please check:")
-        if USE_WEBCAM:
+        if use_webcam:
             print("- If a webcam is connected and not in use by another application.")
             print("- If you have granted camera permissions to the application.")
         else:
-            print(f"- If the video file path is correct: {VIDEO_PATH}")
+            print(f"- If the video file path is correct: {args.source}")
             print("- If the video file exists and is not corrupted.")
         return
 
     print("Video source opened successfully. Press 'q' to quit.")
 
     # --- Initialize MovementDetector based on exercise ---
-    if args.exercise == "pushup":
-        detector = MovementDetector()
-        exercise_name = "Push-ups"
-    elif args.exercise == "squat":
-        detector = SquatDetector()
-        exercise_name = "Squats"
+    if args.exercise == EXERCISE_AUTO:
+        exercise_name = "Detecting exercise"
     else:
-        print(f"Error: Unknown exercise '{args.exercise}'. Please choose 'pushup' or 'squat'.")
-        return
+        exercise_name = get_exercise(args.exercise).display_name
+    detector = create_detector(args.exercise, roi_tracking=args.roi, target_fps=args.target_fps,
+                               adaptive_inference=args.adaptive_inference,
+                               max_inference_interval=args.max_inference_interval, profile=args.profile,
+                               model_complexity=args.model_complexity, smooth_landmarks=args.smooth_landmarks,
+                               enable_segmentation=args.segmentation, input_size=args.input_size,
+                               motion_gate=args.motion_gate)
 
     # --- Main Loop for Video Processing ---
+    start_time = time.perf_counter()
+    frames_processed = 0
+    frame = None
     while True:
-        # Read a frame from the video source.
-        ret, frame = cap.read()
+        # Read a frame from the video source, decoding into the previous frame's buffer
+        # (imshow keeps its own copy) so the loop doesn't allocate a new image every frame.
+        ret, frame = cap.read(frame)
         # If frame was not read successfully, it means the video has ended or an error occurred.
         if not ret:
             print("End of video stream or error reading frame. Exiting.")
             break
 
         # Process frame with the detector
-        image, counter, angle, feedback = detector.process_frame(frame)
+        image, counter, angle, feedback = detector.process_frame(frame, getattr(cap, "timestamp", None))
+        frames_processed += 1
+        processed_fps = frames_processed / (time.perf_counter() - start_time)
+        if args.exercise == EXERCISE_AUTO and detector.exercise is not None:
+            exercise_name = detector.exercise.display_name
 
         # --- Visualize Angle (for debugging/feedback) ---
         if angle is not None:
@@ -83,6 +139,9 @@ def main():
             cv2.putText(image, feedback, (10, 70),
                         cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2, cv2.LINE_AA)
 
+        cv2.putText(image, f"{processed_fps:.1f} fps", (10, image.shape[0] - 15),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 1, cv2.LINE_AA)
+
         # --- Game Loop Logic ---
         if args.target_reps > 0 and counter >= args.target_reps:
             print(f"Congratulations! You reached your target of {args.target_reps} {exercise_name}!")
@@ -90,7 +149,7 @@ def main():
 
         # --- Display the Output Frame ---
         # Show the processed image in a window.
-        cv2.imshow('Webcam Feed with Movement Counter' if USE_WEBCAM else 'Video Feed with Movement Counter', image)
+        cv2.imshow('Webcam Feed with Movement Counter' if use_webcam else 'Video Feed with Movement Counter', image)
 
         # --- Exit Condition ---
         # Wait for 1 millisecond for a key press. If 'q' is pressed, break the loop.
@@ -99,6 +158,10 @@ def main():
             break
 
     # --- Cleanup ---
+    elapsed = time.perf_counter() - start_time
+    print(f"Processed {frames_processed} frames in {elapsed:.1f} s ({frames_processed / elapsed if elapsed else 0.0:.1f} fps).")
+    if getattr(cap, "frames_skipped", 0):
+        print(f"Skipped {cap.frames_skipped} late frames to keep real-time pace.")
     # Release the video capture object.
     cap.release()
     # Destroy all OpenCV windows.
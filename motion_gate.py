@@ -0,0 +1,84 @@
+import cv2
+import numpy as np
+
+from instrumentation import metrics
+
+class MotionGate:
+    # Cheap idle detector in front of pose inference. Each frame is shrunk to a small grayscale
+    # thumbnail and compared with the thumbnail of the last frame the model ran on; while too few
+    # pixels have changed, the scene is static and the previous landmarks are still valid.
+    # Any motion wakes the model on that same frame, and it keeps running for hold_frames after the
+    # motion stops. The model also runs every max_idle_frames so slow changes are never missed.
+    def __init__(self, threshold=12, min_changed_fraction=0.01, thumbnail_width=64, hold_frames=5,
+                 max_idle_frames=30):
+        self.threshold = threshold
+        self.min_changed_fraction = min_changed_fraction
+        self.thumbnail_width = thumbnail_width
+        self.hold_frames = hold_frames
+        self.max_idle_frames = max_idle_frames
+        self.frames = 0
+        self.skipped_frames = 0
+        self._sample = None
+        self._small = None
+        self._gray = None
+        self._diff = None
+        self._reference = None
+        self.reset()
+
+    def reset(self):
+        self._has_reference = False
+        self._hold = 0
+        self._idle_frames = 0
+
+    def _thumbnail(self, image):
+        h, w = image.shape[:2]
+        size = (self.thumbnail_width, max(1, round(h * self.thumbnail_width / w)))
+        if self._gray is None or self._gray.shape != (size[1], size[0]):
+            self._sample = np.empty((size[1] * 4, size[0] * 4, 3), dtype=np.uint8)
+            self._small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+            self._diff = np.empty_like(self._gray)
+            self._reference = np.empty_like(self._gray)
+            self._has_reference = False
+        # Point-sample a 4x thumbnail, then average it down: nearly as noise-robust as averaging
+        # the whole frame (INTER_AREA), at a fraction of the cost on HD frames
+        cv2.resize(image, (size[0] * 4, size[1] * 4), dst=self._sample, interpolation=cv2.INTER_NEAREST)
+        cv2.resize(self._sample, size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+        return self._gray
+
+    def should_infer(self, image):
+        # Returns True if the pose model should run on this frame, False to reuse the last landmarks
+        self.frames += 1
+        with metrics.stage("motion_gate"):
+            gray = self._thumbnail(image)
+            if self._has_reference:
+                cv2.absdiff(gray, self._reference, dst=self._diff)
+                moved = np.count_nonzero(self._diff > self.threshold) >= self.min_changed_fraction * self._diff.size
+            else:
+                moved = True
+
+        if moved:
+            self._hold = self.hold_frames
+        elif self._hold > 0:
+            self._hold -= 1
+
+        if moved or self._hold > 0 or self._idle_frames >= self.max_idle_frames:
+            np.copyto(self._reference, gray)
+            self._has_reference = True
+            self._idle_frames = 0
+            run = True
+        else:
+            self._idle_frames += 1
+            self.skipped_frames += 1
+            metrics.count("inference_skipped_static")
+            run = False
+        metrics.gauge("motion_gate_skip_ratio", self.skipped_frames / self.frames)
+        return run
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "skipped_frames": self.skipped_frames,
+            "skip_ratio": self.skipped_frames / self.frames if self.frames else 0.0,
+        }
@@ -1,33 +1,106 @@
+import time
 import cv2
-import mediapipe as mp
 import numpy as np
-import simpleaudio as sa
-import os
-import logging
+from rep_counting import PUSHUP_RULE, SQUAT_RULE, EVENT_DOWN, EVENT_REP, rule_angle, step, event_feedback, count_reps
+from pose_features import NUM_LANDMARKS, POSE_CONNECTIONS, landmarks_to_array, joint_angles
+from audio_engine import CUE_GO_DEEPER, CUE_REP_COUNT, get_audio_engine
+from roi_tracker import RoiTracker
+from landmark_filters import InferenceScheduler
+from motion_gate import MotionGate
+from frame_buffers import BufferPool
+from instrumentation import metrics
+from pose_pool import get_pose_pool
+from pose_profile import DEFAULT_PROFILE, ComplexityTuner, resolve_profile, pose_settings_for
+from exercise_registry import EXERCISE_AUTO, ExerciseEvaluator, get_exercise, torso_posture
+from rep_log import RepLog
 
-# Set to store paths of audio files for which a warning has already been logged
-_warned_audio_files = set()
+# Colours (BGR) matching MediaPipe's default drawing style
+_CONNECTION_COLOR = (224, 224, 224)
+_LANDMARK_COLOR = (0, 0, 255)
+_LANDMARK_BORDER_COLOR = (255, 255, 255)
 
-def play_sound(file_path):
-    if os.path.exists(file_path):
-        try:
-            wave_obj = sa.WaveObject.from_wave_file(file_path)
-            play_obj = wave_obj.play()
-        except Exception as e:
-            logging.error(f"Error playing audio file {file_path}: {e}")
-    else:
-        if file_path not in _warned_audio_files:
-            logging.warning(f"Audio file not found: {file_path}")
-            _warned_audio_files.add(file_path)
+def draw_pose(image, landmarks, min_visibility=0.5):
+    # Draws a (33, 4) landmark array in normalized full-frame coordinates onto a BGR image.
+    # Drawing from the array (rather than the model's result object) lets remapped or
+    # predicted landmarks be rendered the same way as raw detections.
+    h, w = image.shape[:2]
+    visible = ((landmarks[:, 3] >= min_visibility)
+               & (landmarks[:, 0] >= 0) & (landmarks[:, 0] <= 1)
+               & (landmarks[:, 1] >= 0) & (landmarks[:, 1] <= 1)).tolist()
+    points = np.minimum(landmarks[:, :2] * (w, h), (w - 1, h - 1)).astype(np.int32).tolist()
+    for a, b in POSE_CONNECTIONS:
+        if visible[a] and visible[b]:
+            cv2.line(image, points[a], points[b], _CONNECTION_COLOR, 2)
+    for point, is_visible in zip(points, visible):
+        if is_visible:
+            cv2.circle(image, point, 3, _LANDMARK_BORDER_COLOR, 2)
+            cv2.circle(image, point, 2, _LANDMARK_COLOR, 2)
+
+# Pose settings of the default performance profile; detectors with equal settings share pooled models
+DEFAULT_POSE_SETTINGS = pose_settings_for(resolve_profile())
 
 class MovementDetector:
-    def __init__(self):
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
-        self.mp_drawing = mp.solutions.drawing_utils
+    rule = PUSHUP_RULE
+
+    def __init__(self, enable_sound=True, draw_landmarks=True, roi_tracker=None, inference_scheduler=None,
+                 pose_pool=None, pose_profile=None, complexity_tuner=None, motion_gate=None):
+        self.enable_sound = enable_sound
+        self.roi_tracker = roi_tracker
+        self.inference_scheduler = inference_scheduler
+        self.audio = get_audio_engine() if enable_sound else None
+        self.draw_landmarks = draw_landmarks
+        self.pose_profile = pose_profile or resolve_profile()
+        self.pose_settings = pose_settings_for(self.pose_profile)
+        # Longest side of the image handed to the model; 0 for full resolution
+        self.input_size = self.pose_profile.input_size
+        self.complexity_tuner = complexity_tuner
+        self.motion_gate = motion_gate
+        # The Pose model is borrowed from a pool of warm instances and handed back in close(),
+        # so a detector is cheap to create and a new workout doesn't pay for loading the graph
+        self.pose_pool = pose_pool or get_pose_pool()
+        self.pose = self.pose_pool.acquire(self.pose_settings)
         self.counter = 0
         self.stage = None  # 'down' or 'up'
         self.feedback = ""
+        self.last_landmarks = None
+        self.last_angles = None
+        # Per-rep timing and angle range, saved with the workout
+        self.rep_log = RepLog()
+        # Source timestamp (seconds) of the frame being processed; None times reps by the wall clock
+        self.frame_time = None
+        # Reused every frame so landmark extraction and the model input conversions don't allocate
+        self._landmarks_out = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+        self._buffers = BufferPool()
+
+    def reset(self):
+        # Start counting a new session; also clears the pose tracker so it doesn't carry over between videos
+        self.counter = 0
+        self.stage = None
+        self.feedback = ""
+        self.frame_time = None
+        self.rep_log.reset()
+        self.pose.reset()
+        if self.roi_tracker:
+            self.roi_tracker.reset()
+        if self.inference_scheduler:
+            self.inference_scheduler.reset()
+        if self.complexity_tuner:
+            self.complexity_tuner.reset()
+        if self.motion_gate:
+            self.motion_gate.reset()
+
+    def set_model_complexity(self, model_complexity):
+        # Swaps in a pooled model of another complexity; the counting state carries over
+        if model_complexity == self.pose_settings.get("model_complexity"):
+            return
+        self.pose_pool.release(self.pose, self.pose_settings)
+        self.pose_settings = dict(self.pose_settings, model_complexity=model_complexity)
+        self.pose = self.pose_pool.acquire(self.pose_settings)
+
+    def _play_cue(self, cue_id):
+        # Only enqueues the cue; decoding and playback happen on the audio engine's mixer thread
+        if self.enable_sound:
+            self.audio.trigger(cue_id)
 
     def calculate_angle(self, a, b, c):
         a = np.array(a)  # First
@@ -42,99 +115,213 @@ class MovementDetector:
 
         return angle
 
-    def process_frame(self, image):
+    def process_frame(self, image, timestamp=None):
+        # timestamp: the frame's time in seconds when the source knows it, e.g. its position in a
+        # video file, so reps are timed in video time however fast the file is analysed
+        started = time.perf_counter()
+        self.frame_time = timestamp
+        self.rep_log.start(timestamp)
+        # With a motion gate, a static scene keeps the previous landmarks without running the model.
+        # With an inference scheduler, the model only runs on keyframes and the frames in
+        # between get landmarks predicted from the motion filter.
+        static = self.motion_gate is not None and not self.motion_gate.should_infer(image)
+        if static:
+            landmarks = self.last_landmarks
+        elif self.inference_scheduler and not self.inference_scheduler.next_frame():
+            landmarks = self.inference_scheduler.predict(self._landmarks_out)
+            metrics.count("inference_skipped_interpolated")
+        else:
+            landmarks = self.estimate_pose(image)
+
+        self.last_landmarks = landmarks
+        with metrics.stage("counting"):
+            angle = self.update_from_landmarks(landmarks)
+
+        # Render detections
+        if self.draw_landmarks and landmarks is not None:
+            with metrics.stage("drawing"):
+                draw_pose(image, landmarks)
+
+        # The auto profile retunes the model complexity from the achieved frame rate.
+        # Idle frames say nothing about the model's speed, so they aren't measured.
+        if self.complexity_tuner and not static:
+            model_complexity = self.complexity_tuner.observe(time.perf_counter() - started)
+            if model_complexity is not None:
+                self.set_model_complexity(model_complexity)
+
+        return image, self.counter, angle, self.feedback
+
+    def estimate_pose(self, image):
+        # Runs the pose model; returns a (33, 4) landmark array in full-frame coordinates, or None
+        started = time.perf_counter()
+
+        # With ROI tracking, inference only sees a (downscaled) crop around the previous pose.
+        # Otherwise the frame is downscaled to the profile's input size, if it sets one.
+        if self.roi_tracker:
+            pose_input = self.roi_tracker.prepare(image)
+        elif self.input_size and max(image.shape[:2]) > self.input_size:
+            with metrics.stage("resize"):
+                h, w = image.shape[:2]
+                scale = self.input_size / max(h, w)
+                size = (max(1, int(w * scale)), max(1, int(h * scale)))
+                pose_input = cv2.resize(image, size, dst=self._buffers.get("input", (size[1], size[0], image.shape[2])),
+                                        interpolation=cv2.INTER_AREA)
+        else:
+            pose_input = image
+
         # Recolor image to RGB for mediapipe
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        with metrics.stage("color_conversion"):
+            image_rgb = cv2.cvtColor(pose_input, cv2.COLOR_BGR2RGB, dst=self._buffers.get("rgb", pose_input.shape))
         image_rgb.flags.writeable = False
 
         # Make detection
-        results = self.pose.process(image_rgb)
+        with metrics.stage("inference"):
+            results = self.pose.process(image_rgb)
 
         # Recolor back to BGR for rendering
         image.flags.writeable = True
 
+        landmarks = landmarks_to_array(results.pose_landmarks, self._landmarks_out)
+        if self.roi_tracker:
+            landmarks = self.roi_tracker.update(landmarks)
+        if self.inference_scheduler:
+            landmarks = self.inference_scheduler.observe(landmarks, time.perf_counter() - started)
+        return landmarks
+
+    def update_from_landmarks(self, landmarks):
+        # Runs the rep counter on one frame of landmarks, shape (33, 4), or None when no pose was detected.
+        # Used directly when the landmarks come from a cache instead of a live model.
+        # Cached frames without a detection are stored as NaN rows.
+        if landmarks is None or np.isnan(landmarks[0, 0]):
+            self.feedback = "Adjust position"
+            return None
+
         angle = None
         try:
-            landmarks = results.pose_landmarks.landmark
-
-            # Get coordinates for pushup (left arm)
-            shoulder = [landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].x, landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER.value].y]
-            elbow = [landmarks[self.mp_pose.PoseLandmark.LEFT_ELBOW.value].x, landmarks[self.mp_pose.PoseLandmark.LEFT_ELBOW.value].y]
-            wrist = [landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value].x, landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST.value].y]
-
-            # Calculate elbow angle
-            angle = self.calculate_angle(shoulder, elbow, wrist)
-
-            # Pushup counter logic
-            if angle > 160:
-                self.stage = "down"
-                self.feedback = "Elbows too straight!"
-                play_sound("audio/go_deeper.wav") # Placeholder for specific feedback sound
-            elif angle < 30 and self.stage == 'down':
-                self.stage = "up"
-                self.counter += 1
-                self.feedback = "Good form!"
-                play_sound("audio/rep_count.wav") # Play sound on successful rep
-            else:
-                self.feedback = ""
-
-        except:
+            angle = self.count_rep(landmarks)
+        except Exception:
             self.feedback = "Adjust position"
+        return angle
 
-        # Render detections
-        if results.pose_landmarks:
-            self.mp_drawing.draw_landmarks(image, results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS)
+    def count_rep(self, landmarks):
+        # Compute the whole joint-angle table once, then advance the shared rep state machine on this rule's angle
+        self.last_angles = joint_angles(landmarks)
+        angle = float(rule_angle(self.last_angles, self.rule))
+        self.counter, self.stage, event = step(self.rule, self.counter, self.stage, angle)
+        self.rep_log.observe(angle, event, self.frame_time)
+        self._report_event(event)
+        return angle
 
-        return image, self.counter, angle, self.feedback
+    def _report_event(self, event):
+        self.feedback = event_feedback(self.rule, event)
+        if event == EVENT_DOWN:
+            self._play_cue(CUE_GO_DEEPER) # Placeholder for specific feedback sound
+        elif event == EVENT_REP:
+            self._play_cue(CUE_REP_COUNT) # Play sound on successful rep
+
+    def replay_landmarks(self, frames):
+        # Counts reps over a (frames, 33, 4) landmark stream in one call, continuing from the current state.
+        # No audio cues are played; the full per-frame result is returned for analysis.
+        result = count_reps(frames, self.rule, self.counter, self.stage)
+        self.counter, self.stage = result.counter, result.stage
+        if len(result.angles):
+            self.feedback = result.feedback
+        return result
+
+    def close(self):
+        # Returns the Pose model to the pool; the detector can't run inference afterwards
+        pose, self.pose = getattr(self, "pose", None), None
+        if pose is not None:
+            self.pose_pool.release(pose, self.pose_settings)
 
     def __del__(self):
-        self.pose.close()
+        self.close()
 
 class SquatDetector(MovementDetector):
-    def __init__(self):
-        super().__init__()
+    rule = SQUAT_RULE
 
-    def process_frame(self, image):
-        # Recolor image to RGB for mediapipe
-        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        image_rgb.flags.writeable = False
+    def __init__(self, enable_sound=True, draw_landmarks=True, roi_tracker=None, inference_scheduler=None,
+                 pose_pool=None, pose_profile=None, complexity_tuner=None, motion_gate=None):
+        super().__init__(enable_sound, draw_landmarks, roi_tracker, inference_scheduler, pose_pool, pose_profile,
+                         complexity_tuner, motion_gate)
 
-        # Make detection
-        results = self.pose.process(image_rgb)
+class AutoExerciseDetector(MovementDetector):
+    # Counts whichever registered exercise is being performed. Every exercise is evaluated on the
+    # same pose estimate, so this runs one inference per frame however many exercises are registered.
+    def __init__(self, enable_sound=True, draw_landmarks=True, roi_tracker=None, inference_scheduler=None,
+                 pose_pool=None, pose_profile=None, complexity_tuner=None, motion_gate=None, evaluator=None):
+        super().__init__(enable_sound, draw_landmarks, roi_tracker, inference_scheduler, pose_pool, pose_profile,
+                         complexity_tuner, motion_gate)
+        self.evaluator = evaluator or ExerciseEvaluator()
+        self._aspect_ratio = 1.0
+        self._candidate_logs = [RepLog() for _ in self.evaluator.definitions]
 
-        # Recolor back to BGR for rendering
-        image.flags.writeable = True
+    @property
+    def exercise(self):
+        # Definition of the recognised exercise, or None until one has counted a rep
+        return self.evaluator.current
 
-        angle = None
-        try:
-            landmarks = results.pose_landmarks.landmark
-
-            # Get coordinates for squat (left leg)
-            hip = [landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].x, landmarks[self.mp_pose.PoseLandmark.LEFT_HIP.value].y]
-            knee = [landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].x, landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE.value].y]
-            ankle = [landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].x, landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE.value].y]
-
-            # Calculate knee angle
-            angle = self.calculate_angle(hip, knee, ankle)
-
-            # Squat counter logic
-            if angle < 90:  # Assuming a squat is when the knee angle is less than 90 degrees
-                self.stage = "down"
-                self.feedback = "Go deeper!"
-                play_sound("audio/go_deeper.wav") # Placeholder for specific feedback sound
-            elif angle > 160 and self.stage == 'down': # Assuming standing up is when the knee angle is greater than 160 degrees
-                self.stage = "up"
-                self.counter += 1
-                self.feedback = "Good form!"
-                play_sound("audio/rep_count.wav") # Play sound on successful rep
-            else:
-                self.feedback = ""
+    def reset(self):
+        super().reset()
+        self.evaluator.reset()
+        self._candidate_logs = [RepLog() for _ in self.evaluator.definitions]
 
-        except:
-            self.feedback = "Adjust position"
+    def process_frame(self, image, timestamp=None):
+        h, w = image.shape[:2]
+        self._aspect_ratio = w / h
+        if self._candidate_logs is not None:
+            for log in self._candidate_logs:
+                log.start(timestamp)
+        return super().process_frame(image, timestamp)
 
-        # Render detections
-        if results.pose_landmarks:
-            self.mp_drawing.draw_landmarks(image, results.pose_landmarks, self.mp_pose.POSE_CONNECTIONS)
+    def count_rep(self, landmarks):
+        self.last_angles = joint_angles(landmarks)
+        angle = self.evaluator.update(self.last_angles, torso_posture(landmarks, self._aspect_ratio))
+        recognising = self._candidate_logs is not None
+        if recognising:
+            # Until an exercise is recognised every exercise logs its own cycle, so the rep that
+            # recognises one keeps its start time and angle range
+            for log, candidate_angle, event in zip(self._candidate_logs, self.evaluator.angles, self.evaluator.events):
+                if candidate_angle == candidate_angle:
+                    log.observe(candidate_angle, event, self.frame_time)
+            if self.exercise is None:
+                self.feedback = ""
+                return None
+            self.rep_log = self._candidate_logs[self.evaluator.definitions.index(self.exercise)]
+            self._candidate_logs = None
+        self.rule = self.exercise.rule
+        self.counter, self.stage, event = self.evaluator.state()
+        if not recognising:
+            self.rep_log.observe(angle, event, self.frame_time)
+        self._report_event(event)
+        return angle
+
+DETECTOR_CLASSES = {
+    "pushup": MovementDetector,
+    "squat": SquatDetector,
+}
 
-        return image, self.counter, angle, self.feedback
\ No newline at end of file
+def create_detector(exercise, roi_tracking=False, target_fps=0, adaptive_inference=False, max_inference_interval=4,
+                    profile=DEFAULT_PROFILE, model_complexity=None, smooth_landmarks=None, enable_segmentation=None,
+                    input_size=None, motion_gate=False, **detector_kwargs):
+    # Builds the detector for an exercise name ("pushup"/"Pushup", ..., or "auto") with the requested performance options
+    name = exercise.lower()
+    detector_class = AutoExerciseDetector if name == EXERCISE_AUTO else DETECTOR_CLASSES.get(name, MovementDetector)
+    pose_profile = resolve_profile(profile, model_complexity, smooth_landmarks, enable_segmentation, input_size)
+    roi_tracker = None
+    if roi_tracking:
+        roi_tracker = RoiTracker(target_fps=target_fps or None, max_input_size=pose_profile.input_size or 640)
+    inference_scheduler = None
+    if adaptive_inference:
+        inference_scheduler = InferenceScheduler(target_fps=target_fps or 30, max_interval=max_inference_interval)
+    complexity_tuner = None
+    if pose_profile.auto:
+        complexity_tuner = ComplexityTuner(target_fps=target_fps or 30, model_complexity=pose_profile.model_complexity)
+    detector = detector_class(roi_tracker=roi_tracker, inference_scheduler=inference_scheduler, pose_profile=pose_profile,
+                              complexity_tuner=complexity_tuner, motion_gate=MotionGate() if motion_gate else None,
+                              **detector_kwargs)
+    # Exercises registered without a detector class of their own count with the generic one
+    definition = get_exercise(name)
+    if definition is not None and name not in DETECTOR_CLASSES:
+        detector.rule = definition.rule
+    return detector
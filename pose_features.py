@@ -0,0 +1,70 @@
+import numpy as np
+
+# Number of landmarks in the MediaPipe Pose topology; each stored as (x, y, z, visibility)
+NUM_LANDMARKS = 33
+
+# Landmark indices, matching mediapipe.solutions.pose.PoseLandmark
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_ELBOW, RIGHT_ELBOW = 13, 14
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+LEFT_HIP, RIGHT_HIP = 23, 24
+LEFT_KNEE, RIGHT_KNEE = 25, 26
+LEFT_ANKLE, RIGHT_ANKLE = 27, 28
+LEFT_FOOT_INDEX, RIGHT_FOOT_INDEX = 31, 32
+
+# Every tracked joint angle: name -> (first, mid, end) landmark; the angle is measured at "mid"
+JOINT_ANGLES = {
+    "left_elbow": (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    "right_elbow": (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    "left_shoulder": (LEFT_ELBOW, LEFT_SHOULDER, LEFT_HIP),
+    "right_shoulder": (RIGHT_ELBOW, RIGHT_SHOULDER, RIGHT_HIP),
+    "left_hip": (LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE),
+    "right_hip": (RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE),
+    "left_knee": (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    "right_knee": (RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+    "left_ankle": (LEFT_KNEE, LEFT_ANKLE, LEFT_FOOT_INDEX),
+    "right_ankle": (RIGHT_KNEE, RIGHT_ANKLE, RIGHT_FOOT_INDEX),
+}
+
+# Skeleton edges, matching mediapipe.solutions.pose.POSE_CONNECTIONS
+POSE_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+)
+
+ANGLE_NAMES = tuple(JOINT_ANGLES)
+ANGLE_INDEX = {name: i for i, name in enumerate(ANGLE_NAMES)}
+
+# Gather indices for computing the whole table in one pass
+_FIRST, _MID, _END = (np.array(idx, dtype=np.intp) for idx in zip(*JOINT_ANGLES.values()))
+
+def landmarks_to_array(pose_landmarks, out=None):
+    # Converts a MediaPipe landmark list to a float32 array of shape (33, 4), or None when nothing was detected.
+    # Pass `out` to fill a reused buffer instead of allocating a new one.
+    if pose_landmarks is None:
+        return None
+    if out is None:
+        out = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    # A single flat assignment is much cheaper than per-element numpy writes
+    out.reshape(-1)[:] = [v for lm in pose_landmarks.landmark for v in (lm.x, lm.y, lm.z, lm.visibility)]
+    return out
+
+def joint_angles(frames, names=None):
+    # Joint angles in degrees (0-180) for one frame (33, 4) -> (n_angles,)
+    # or a batch (frames, 33, 4) -> (frames, n_angles). Columns follow `names`, or ANGLE_NAMES by default.
+    # Frames without a pose (NaN rows) yield NaN angles.
+    if names is None:
+        first, mid, end = _FIRST, _MID, _END
+    else:
+        first, mid, end = (np.array(idx, dtype=np.intp) for idx in zip(*(JOINT_ANGLES[name] for name in names)))
+
+    frames = np.asarray(frames)
+    mid_xy = frames[..., mid, :2].astype(np.float64)
+    to_first = frames[..., first, :2] - mid_xy
+    to_end = frames[..., end, :2] - mid_xy
+    radians = np.arctan2(to_end[..., 1], to_end[..., 0]) - np.arctan2(to_first[..., 1], to_first[..., 0])
+    angles = np.abs(radians * 180.0 / np.pi)
+    return np.where(angles > 180.0, 360.0 - angles, angles)
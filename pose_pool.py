@@ -0,0 +1,82 @@
+import logging
+import threading
+
+import numpy as np
+
+# Keeps built MediaPipe Pose graphs alive between workouts. Detectors borrow a model with
+# acquire() and hand it back with release(), so starting a new set costs no model load and
+# finished sessions don't leave graphs waiting for the garbage collector.
+
+def _settings_key(settings):
+    return tuple(sorted(settings.items()))
+
+def _create_pose(settings):
+    import mediapipe as mp
+    return mp.solutions.pose.Pose(**settings)
+
+class PosePool:
+    def __init__(self, factory=_create_pose, max_idle=2):
+        self.factory = factory
+        self.max_idle = max_idle
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, settings):
+        key = _settings_key(settings)
+        with self._lock:
+            idle = self._idle.get(key)
+            pose = idle.pop() if idle else None
+        if pose is not None:
+            self.reused += 1
+            # Clear tracking state left over from the previous session
+            pose.reset()
+            return pose
+        self.created += 1
+        return self.factory(settings)
+
+    def release(self, pose, settings):
+        key = _settings_key(settings)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle:
+                idle.append(pose)
+                return
+        pose.close()
+
+    def warm(self, settings, count=1):
+        # Builds models ahead of time and runs one inference on each, so the first real frame is fast too
+        with self._lock:
+            missing = count - len(self._idle.get(_settings_key(settings), []))
+        for _ in range(max(0, missing)):
+            try:
+                pose = self.factory(settings)
+            except Exception as e:
+                logging.error(f"Could not load the pose model: {e}")
+                return
+            self.created += 1
+            try:
+                pose.process(np.zeros((256, 256, 3), dtype=np.uint8))
+            except Exception as e:
+                logging.warning(f"Pose warm-up inference failed: {e}")
+            self.release(pose, settings)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for poses in idle.values():
+            for pose in poses:
+                pose.close()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pose_pool():
+    # Process-wide pool shared by all detectors
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PosePool()
+    return _pool
@@ -0,0 +1,136 @@
+import logging
+import time
+from collections import namedtuple
+
+# Performance profiles trade pose accuracy for speed. Each sets the MediaPipe model complexity
+# (0 = lite, 1 = full, 2 = heavy), landmark smoothing, segmentation and the longest side of the
+# image handed to the model (0 = full resolution). "auto" starts from "balanced" and lets a
+# ComplexityTuner step the model complexity up or down to hold a target frame rate.
+PoseProfile = namedtuple("PoseProfile", ["name", "model_complexity", "smooth_landmarks", "enable_segmentation",
+                                         "input_size", "auto"])
+
+PROFILE_FAST = "fast"
+PROFILE_BALANCED = "balanced"
+PROFILE_ACCURATE = "accurate"
+PROFILE_AUTO = "auto"
+
+PROFILES = {
+    PROFILE_FAST: PoseProfile(PROFILE_FAST, 0, True, False, 480, False),
+    PROFILE_BALANCED: PoseProfile(PROFILE_BALANCED, 1, True, False, 0, False),
+    PROFILE_ACCURATE: PoseProfile(PROFILE_ACCURATE, 2, True, False, 0, False),
+    PROFILE_AUTO: PoseProfile(PROFILE_AUTO, 1, True, False, 0, True),
+}
+DEFAULT_PROFILE = PROFILE_BALANCED
+
+# Option names accepted by resolve_profile(), as used in settings.ini and performance option dicts
+PROFILE_OPTIONS = ("profile", "model_complexity", "smooth_landmarks", "enable_segmentation", "input_size")
+
+# Settings every Pose model is built with, whatever the profile
+BASE_POSE_SETTINGS = {"min_detection_confidence": 0.5, "min_tracking_confidence": 0.5}
+
+MIN_MODEL_COMPLEXITY = 0
+MAX_MODEL_COMPLEXITY = 2
+
+def resolve_profile(profile=DEFAULT_PROFILE, model_complexity=None, smooth_landmarks=None, enable_segmentation=None,
+                    input_size=None):
+    # Named profile with any individually set options applied on top (None keeps the profile's value)
+    base = PROFILES.get(profile)
+    if base is None:
+        logging.warning(f"Unknown performance profile '{profile}', using '{DEFAULT_PROFILE}'")
+        base = PROFILES[DEFAULT_PROFILE]
+    overrides = {
+        "model_complexity": model_complexity,
+        "smooth_landmarks": smooth_landmarks,
+        "enable_segmentation": enable_segmentation,
+        "input_size": input_size,
+    }
+    resolved = base._replace(**{key: value for key, value in overrides.items() if value is not None})
+    if not MIN_MODEL_COMPLEXITY <= resolved.model_complexity <= MAX_MODEL_COMPLEXITY:
+        raise ValueError(f"model_complexity must be between {MIN_MODEL_COMPLEXITY} and {MAX_MODEL_COMPLEXITY}")
+    return resolved
+
+def profile_from_options(options):
+    # Picks the profile options out of a performance options dict (see PROFILE_OPTIONS)
+    return resolve_profile(**{key: options[key] for key in PROFILE_OPTIONS if options.get(key) is not None})
+
+def pose_settings_for(profile):
+    settings = dict(BASE_POSE_SETTINGS)
+    settings["model_complexity"] = profile.model_complexity
+    settings["smooth_landmarks"] = profile.smooth_landmarks
+    settings["enable_segmentation"] = profile.enable_segmentation
+    return settings
+
+class ComplexityTuner:
+    # Measures the achieved processing fps in short windows during the first seconds of a workout
+    # and steps the model complexity down when it misses target_fps, or up when there is plenty of
+    # headroom. It never steps back up after a step down, and a step up that then misses the target
+    # is undone and ends tuning, so it can't oscillate.
+    def __init__(self, target_fps=30, model_complexity=1, window_seconds=2.0, tune_seconds=10.0,
+                 step_up_margin=2.0, tolerance=0.1, warmup_frames=5):
+        self.target_fps = target_fps
+        self.model_complexity = model_complexity
+        self.window_seconds = window_seconds
+        self.tune_seconds = tune_seconds
+        self.step_up_margin = step_up_margin
+        self.tolerance = tolerance
+        self.warmup_frames = warmup_frames
+        self.reset()
+
+    def reset(self):
+        self.settled = False
+        self.measured_fps = None
+        self._started_at = None
+        self._window_started_at = None
+        self._window_frames = 0
+        self._window_busy = 0.0
+        self._skip_frames = self.warmup_frames
+        self._stepped_up = False
+        self._stepped_down = False
+
+    def observe(self, seconds):
+        # Records the processing time of one frame. Returns the model complexity to switch to, or None.
+        if self.settled:
+            return None
+        now = time.perf_counter()
+        if self._started_at is None:
+            self._started_at = now
+        # The first frames after a model (re)load include its warm-up; don't count them
+        if self._skip_frames > 0:
+            self._skip_frames -= 1
+            self._window_started_at = now
+            return None
+
+        self._window_frames += 1
+        self._window_busy += seconds
+        if now - self._window_started_at < self.window_seconds:
+            return None
+
+        self.measured_fps = self._window_frames / self._window_busy if self._window_busy else float("inf")
+        new_complexity = self._decide(self.measured_fps)
+        self._window_frames, self._window_busy = 0, 0.0
+        self._window_started_at = now
+        if now - self._started_at >= self.tune_seconds:
+            self.settled = True
+        if new_complexity is None:
+            return None
+        logging.info(f"Auto profile: {self.measured_fps:.1f} fps against a target of {self.target_fps}, "
+                     f"model complexity {self.model_complexity} -> {new_complexity}")
+        self.model_complexity = new_complexity
+        self._skip_frames = self.warmup_frames
+        return new_complexity
+
+    def _decide(self, fps):
+        if fps < self.target_fps * (1 - self.tolerance):
+            if self.model_complexity > MIN_MODEL_COMPLEXITY:
+                # Undoing a step up ends tuning
+                self.settled = self._stepped_up
+                self._stepped_down = True
+                return self.model_complexity - 1
+            self.settled = True
+        elif (fps > self.target_fps * self.step_up_margin and self.model_complexity < MAX_MODEL_COMPLEXITY
+              and not self._stepped_down):
+            self._stepped_up = True
+            return self.model_complexity + 1
+        else:
+            self.settled = True
+        return None
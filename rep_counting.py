@@ -0,0 +1,130 @@
+from collections import namedtuple
+
+import numpy as np
+
+from pose_features import ANGLE_INDEX, joint_angles
+
+# Counting rules for the rep state machine. A frame whose joint angle satisfies the
+# "down" condition moves the stage to 'down'; a frame satisfying the "up" condition while
+# in 'down' moves the stage to 'up' and counts a rep. Conditions are ('<' or '>', threshold)
+# on the named joint angle from pose_features.JOINT_ANGLES.
+CountingRule = namedtuple("CountingRule", ["angle", "down_condition", "up_condition", "down_feedback", "rep_feedback"])
+
+PUSHUP_RULE = CountingRule(
+    angle="left_elbow",
+    down_condition=(">", 160),
+    up_condition=("<", 30),
+    down_feedback="Elbows too straight!",
+    rep_feedback="Good form!",
+)
+
+SQUAT_RULE = CountingRule(
+    angle="left_knee",
+    down_condition=("<", 90),
+    up_condition=(">", 160),
+    down_feedback="Go deeper!",
+    rep_feedback="Good form!",
+)
+
+# Per-frame events produced by the state machine
+EVENT_NONE = 0
+EVENT_DOWN = 1
+EVENT_REP = 2
+
+NO_POSE_FEEDBACK = "Adjust position"
+
+ReplayResult = namedtuple("ReplayResult", ["counter", "stage", "feedback", "angles", "events", "rep_frames"])
+
+def _matches(condition, angle):
+    op, threshold = condition
+    return angle > threshold if op == ">" else angle < threshold
+
+def rule_angle(angles, rule):
+    # Picks the rule's joint angle out of a joint_angles() table (one frame or a batch)
+    return angles[..., ANGLE_INDEX[rule.angle]]
+
+def step(rule, counter, stage, angle):
+    # One frame of the state machine. Pure: returns (counter, stage, event)
+    if _matches(rule.down_condition, angle):
+        return counter, "down", EVENT_DOWN
+    if _matches(rule.up_condition, angle) and stage == "down":
+        return counter + 1, "up", EVENT_REP
+    return counter, stage, EVENT_NONE
+
+def event_feedback(rule, event):
+    if event == EVENT_DOWN:
+        return rule.down_feedback
+    if event == EVENT_REP:
+        return rule.rep_feedback
+    return ""
+
+def count_reps(frames, rule, counter=0, stage=None):
+    # Runs the state machine over a whole landmark stream at once, without video or a pose model.
+    # Equivalent to calling step() frame by frame, starting from (counter, stage).
+    angles = joint_angles(frames, (rule.angle,))[..., 0]
+    return count_reps_from_angles(angles, rule, counter, stage)
+
+def count_reps_from_angles(angles, rule, counter=0, stage=None):
+    angles = np.asarray(angles, dtype=np.float64)
+    with np.errstate(invalid="ignore"):
+        down = _matches(rule.down_condition, angles)
+        up = _matches(rule.up_condition, angles) & ~down
+
+    # Triggers: 1 = down, 2 = up-condition. An up-trigger counts a rep only when the
+    # previous trigger (or the initial stage) was a down-trigger.
+    triggers = np.where(down, EVENT_DOWN, np.where(up, EVENT_REP, EVENT_NONE)).astype(np.int8)
+    trigger_frames = np.flatnonzero(triggers)
+    trigger_values = triggers[trigger_frames]
+    previous = np.empty_like(trigger_values)
+    if len(previous):
+        previous[0] = EVENT_DOWN if stage == "down" else EVENT_NONE
+        previous[1:] = trigger_values[:-1]
+    is_rep = (trigger_values == EVENT_REP) & (previous == EVENT_DOWN)
+    rep_frames = trigger_frames[is_rep]
+
+    events = np.where(down, EVENT_DOWN, EVENT_NONE).astype(np.int8)
+    events[rep_frames] = EVENT_REP
+
+    final_counter = counter + len(rep_frames)
+    final_stage = stage
+    if len(trigger_values):
+        if trigger_values[-1] == EVENT_DOWN:
+            final_stage = "down"
+        elif len(rep_frames):
+            final_stage = "up"
+
+    if len(angles) == 0:
+        feedback = ""
+    elif np.isnan(angles[-1]):
+        feedback = NO_POSE_FEEDBACK
+    else:
+        feedback = event_feedback(rule, events[-1])
+
+    return ReplayResult(final_counter, final_stage, feedback, angles, events, rep_frames)
+
+# Outcome of counting one chunk of a stream for each stage it could start in.
+# outcomes maps an initial stage (None or 'down') to (reps, final_stage, rep_frames), with
+# rep_frames as absolute frame indices. 'up' behaves like None: only a 'down' stage lets an up
+# trigger count, and a final stage of None means "unchanged from the initial stage".
+ChunkCount = namedtuple("ChunkCount", ["first_frame", "frames", "outcomes"])
+
+def summarize_chunk(angles, rule, first_frame=0):
+    # Counts a chunk of rule angles from both possible initial stages, so chunks can be counted
+    # independently (and in parallel) and stitched together afterwards with stitch_chunks()
+    outcomes = {}
+    for stage in (None, "down"):
+        result = count_reps_from_angles(angles, rule, 0, stage)
+        outcomes[stage] = (result.counter, result.stage, result.rep_frames + first_frame)
+    return ChunkCount(first_frame, len(angles), outcomes)
+
+def stitch_chunks(chunks, counter=0, stage=None):
+    # Threads the counting state through consecutive chunks; returns (counter, stage, rep_frames).
+    # The result equals count_reps over the concatenated stream.
+    rep_frames = []
+    for chunk in sorted(chunks, key=lambda c: c.first_frame):
+        reps, final_stage, frames = chunk.outcomes["down" if stage == "down" else None]
+        counter += reps
+        stage = stage if final_stage is None else final_stage
+        rep_frames.append(frames)
+    rep_frames = np.concatenate(rep_frames) if rep_frames else np.empty(0, dtype=np.intp)
+    return counter, stage, rep_frames
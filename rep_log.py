@@ -0,0 +1,71 @@
+import time
+
+import numpy as np
+
+from rep_counting import EVENT_DOWN, EVENT_REP
+
+# Per-rep records kept during a workout: the rep number, when its down transition and the rep
+# itself happened (seconds from the workout's first processed frame, by the frames' own timestamps
+# when the source has them, so a video analysed faster than real time still records video time), and the
+# range of the rule angle over the rep's cycle (min_angle is the depth for squats); values that
+# weren't observed are None. Tempo and fatigue follow from the times.
+REP_FIELDS = ("rep", "started_at", "completed_at", "min_angle", "max_angle")
+
+class RepLog:
+    # Ring buffer of per-rep records in a preallocated array. Recording a rep writes one row in
+    # place, with no I/O and no new objects; the records are read once, when the workout is saved.
+    # Past `capacity` reps the oldest records are overwritten.
+    def __init__(self, capacity=2048):
+        self.capacity = capacity
+        self._records = np.full((capacity, len(REP_FIELDS)), np.nan)
+        self.reset()
+
+    def reset(self):
+        self.count = 0 # Reps recorded, including overwritten ones
+        self._clock_start = None
+        self._down_at = None
+        self._min_angle = np.inf
+        self._max_angle = -np.inf
+
+    def start(self, now=None):
+        # Starts the workout clock; called for every processed frame, including frames without a
+        # pose, and only the first call counts
+        if self._clock_start is None:
+            self._clock_start = time.perf_counter() if now is None else now
+
+    def observe(self, angle, event, now=None):
+        # Called every frame with the rule angle and the state machine's event for that frame;
+        # `now` is the frame's timestamp in seconds, or None for the wall clock
+        if now is None:
+            now = time.perf_counter()
+        if self._clock_start is None:
+            self._clock_start = now
+        if angle < self._min_angle:
+            self._min_angle = angle
+        if angle > self._max_angle:
+            self._max_angle = angle
+        if event == EVENT_DOWN:
+            if self._down_at is None:
+                self._down_at = now
+        elif event == EVENT_REP:
+            record = self._records[self.count % self.capacity]
+            record[0] = self.count + 1
+            record[2] = now - self._clock_start
+            if self._down_at is None:
+                # The rep's cycle wasn't observed (e.g. an exercise recognised by this rep): only its time is known
+                record[1] = record[3] = record[4] = np.nan
+            else:
+                record[1] = self._down_at - self._clock_start
+                record[3] = self._min_angle
+                record[4] = self._max_angle
+            self.count += 1
+            # The next rep's cycle starts from this frame
+            self._down_at = None
+            self._min_angle = self._max_angle = angle
+
+    def records(self):
+        # The kept records, oldest first, as tuples of REP_FIELDS with None for missing values
+        kept = min(self.count, self.capacity)
+        first = self.count - kept
+        rows = [self._records[i % self.capacity].tolist() for i in range(first, self.count)]
+        return [(int(row[0]),) + tuple(None if value != value else value for value in row[1:]) for row in rows]
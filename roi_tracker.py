@@ -0,0 +1,112 @@
+import time
+
+import cv2
+import numpy as np
+
+from frame_buffers import BufferPool
+
+class RoiTracker:
+    # Crops each frame to a padded box around the previous frame's pose before inference and
+    # maps the resulting landmarks back to full-frame coordinates. Falls back to the full frame
+    # whenever tracking is lost. Optionally picks the inference resolution to hold a target fps.
+    def __init__(self, padding=0.3, min_visibility=0.5, min_visible_landmarks=8, target_fps=None,
+                 min_input_size=192, max_input_size=640):
+        self.padding = padding
+        self.min_visibility = min_visibility
+        self.min_visible_landmarks = min_visible_landmarks
+        self.target_fps = target_fps
+        self.min_input_size = min_input_size
+        self.max_input_size = max_input_size
+        # Longest side of the image handed to the model, in pixels
+        self.input_size = max_input_size
+        self.roi = None  # (x0, y0, x1, y1) in pixels, or None for the full frame
+        self._last_prepared = None
+        self._inference_time = None
+        self._started_at = None
+        # Downscaled crops are written into a reused buffer (reallocated only when the crop size changes)
+        self._buffers = BufferPool()
+
+    def reset(self):
+        self.roi = None
+        self._inference_time = None
+
+    def prepare(self, image):
+        # Returns the (cropped and downscaled) image to run pose inference on
+        h, w = image.shape[:2]
+        x0, y0, x1, y1 = self.roi if self.roi is not None else (0, 0, w, h)
+        crop = image[y0:y1, x0:x1]
+
+        longest = max(x1 - x0, y1 - y0)
+        if longest > self.input_size:
+            scale = self.input_size / longest
+            size = (max(1, int((x1 - x0) * scale)), max(1, int((y1 - y0) * scale)))
+            crop = cv2.resize(crop, size, dst=self._buffers.get("crop", (size[1], size[0], image.shape[2])),
+                              interpolation=cv2.INTER_AREA)
+
+        self._last_prepared = (x0, y0, x1, y1, w, h)
+        self._started_at = time.perf_counter()
+        return crop
+
+    def update(self, landmarks):
+        # Maps landmarks (33, 4) from the prepared crop back to full-frame coordinates in place,
+        # then moves the ROI for the next frame. Pass None when no pose was detected.
+        if self._started_at is not None:
+            self._adapt_input_size(time.perf_counter() - self._started_at)
+            self._started_at = None
+
+        if self._last_prepared is None:
+            return landmarks
+        x0, y0, x1, y1, w, h = self._last_prepared
+        if landmarks is None:
+            self.roi = None
+            return None
+
+        landmarks[:, 0] = (landmarks[:, 0] * (x1 - x0) + x0) / w
+        landmarks[:, 1] = (landmarks[:, 1] * (y1 - y0) + y0) / h
+        landmarks[:, 2] *= (x1 - x0) / w
+        self._track(landmarks, w, h)
+        return landmarks
+
+    def _track(self, landmarks, w, h):
+        visible = landmarks[landmarks[:, 3] >= self.min_visibility]
+        if len(visible) < self.min_visible_landmarks:
+            self.roi = None
+            return
+
+        # Padded square-ish box around the visible landmarks, clamped to the frame
+        left, top = visible[:, 0].min() * w, visible[:, 1].min() * h
+        right, bottom = visible[:, 0].max() * w, visible[:, 1].max() * h
+        side = max(right - left, bottom - top) * (1 + 2 * self.padding)
+        cx, cy = (left + right) / 2, (top + bottom) / 2
+        new_roi = (
+            int(np.clip(cx - side / 2, 0, w)), int(np.clip(cy - side / 2, 0, h)),
+            int(np.clip(cx + side / 2, 0, w)), int(np.clip(cy + side / 2, 0, h)),
+        )
+        if new_roi[2] - new_roi[0] < 32 or new_roi[3] - new_roi[1] < 32:
+            self.roi = None
+            return
+
+        # Keep the crop stable while the pose stays well inside it; the model tracks better
+        # when its input window doesn't shift every frame
+        if self.roi is not None and self._contains(self.roi, (left, top, right, bottom)) \
+                and (self.roi[2] - self.roi[0]) < 1.5 * (new_roi[2] - new_roi[0]):
+            return
+        self.roi = new_roi
+
+    def _contains(self, roi, box):
+        x0, y0, x1, y1 = roi
+        margin_x = (x1 - x0) * self.padding / 2
+        margin_y = (y1 - y0) * self.padding / 2
+        return (box[0] >= x0 + margin_x and box[1] >= y0 + margin_y
+                and box[2] <= x1 - margin_x and box[3] <= y1 - margin_y)
+
+    def _adapt_input_size(self, elapsed):
+        if not self.target_fps:
+            return
+        # Smooth the inference time, then step the input size toward the frame budget
+        self._inference_time = elapsed if self._inference_time is None else 0.9 * self._inference_time + 0.1 * elapsed
+        budget = 1.0 / self.target_fps
+        if self._inference_time > budget:
+            self.input_size = max(self.min_input_size, int(self.input_size * 0.9))
+        elif self._inference_time < 0.7 * budget:
+            self.input_size = min(self.max_input_size, int(self.input_size * 1.05) + 1)
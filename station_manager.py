@@ -0,0 +1,214 @@
+import argparse
+import logging
+import multiprocessing
+import queue
+import signal
+import time
+from collections import namedtuple
+
+import cv2
+
+from database_manager import DatabaseManager
+from achievement_engine import get_achievement_engine
+from exercise_registry import get_exercise
+from movement_detector import create_detector
+
+# One station = one video source with its own exercise and target. Each station runs in its own
+# process with its own detector and Pose graph, so stations don't contend for the GIL or the model.
+# Stations report counts and feedback over a shared queue; workouts are saved by a single writer.
+StationConfig = namedtuple("StationConfig", ["name", "source", "exercise", "target_reps"])
+
+# Messages sent from station processes to the manager
+MSG_STATUS = "status"
+MSG_FINISHED = "finished"
+MSG_ERROR = "error"
+
+StationStatus = namedtuple("StationStatus", ["name", "exercise", "counter", "target_reps", "feedback", "fps", "finished"])
+
+def parse_station(spec, index):
+    # "source,exercise[,target_reps[,name]]", where source is a webcam index or a video path
+    parts = [part.strip() for part in spec.split(",")]
+    if len(parts) < 2:
+        raise ValueError(f"Invalid station '{spec}': expected source,exercise[,target_reps[,name]]")
+    source = int(parts[0]) if parts[0].isdigit() else parts[0]
+    definition = get_exercise(parts[1])
+    if definition is None:
+        raise ValueError(f"Invalid station '{spec}': unknown exercise '{parts[1]}'")
+    target_reps = int(parts[2]) if len(parts) > 2 and parts[2] else 0
+    name = parts[3] if len(parts) > 3 else f"station{index + 1}"
+    return StationConfig(name, source, definition.name, target_reps)
+
+def _run_station(config, message_queue, stop_event, performance_options):
+    # Entry point of a station process. The manager owns shutdown via stop_event.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    cv2.setNumThreads(1)
+
+    cap = cv2.VideoCapture(config.source)
+    if not cap.isOpened():
+        message_queue.put((MSG_ERROR, config.name, f"Could not open video source {config.source}"))
+        return
+
+    # Video files are read as fast as the station can go: time reps by the frames' position in the file
+    from_file = not isinstance(config.source, int)
+    detector = None
+    start = time.perf_counter()
+    frames = 0
+    last_report = (None, None)
+    try:
+        detector = create_detector(config.exercise, enable_sound=False, draw_landmarks=False, **performance_options)
+        while not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 if from_file else None
+            _, counter, _, feedback = detector.process_frame(frame, timestamp)
+            frames += 1
+
+            # Only report changes, so N stations don't flood the queue with identical updates
+            if (counter, feedback) != last_report:
+                fps = frames / (time.perf_counter() - start)
+                message_queue.put((MSG_STATUS, config.name, counter, feedback, fps))
+                last_report = (counter, feedback)
+
+            if config.target_reps > 0 and counter >= config.target_reps:
+                break
+    except Exception as e:
+        message_queue.put((MSG_ERROR, config.name, str(e)))
+    finally:
+        cap.release()
+    if detector is None:
+        return
+
+    duration = time.perf_counter() - start
+    message_queue.put((MSG_FINISHED, config.name, detector.counter, int(duration), frames / duration if duration else 0.0,
+                       detector.rep_log.records()))
+
+class StationManager:
+    def __init__(self, stations, db_name="workout_history.db", performance_options=None, on_status=None):
+        self.stations = list(stations)
+        if len({station.name for station in self.stations}) != len(self.stations):
+            raise ValueError("Station names must be unique")
+        self.performance_options = performance_options or {}
+        self.on_status = on_status
+        self.status = {
+            station.name: StationStatus(station.name, station.exercise, 0, station.target_reps, "", 0.0, False)
+            for station in self.stations
+        }
+        self._configs = {station.name: station for station in self.stations}
+        # Stations are spawned, not forked: the manager may be running threads (the database writer,
+        # or a GUI), which a forked child would inherit in whatever state they were in
+        self._context = multiprocessing.get_context("spawn")
+        self._messages = self._context.Queue()
+        self._stop_event = self._context.Event()
+        self._processes = {}
+        self.db_name = db_name
+        self._db = None
+
+    def start(self):
+        if self.db_name:
+            # Saves are queued and committed by the database's own writer thread, in batches
+            self._db = DatabaseManager(self.db_name)
+        for station in self.stations:
+            process = self._context.Process(target=_run_station, name=f"Station-{station.name}",
+                                            args=(station, self._messages, self._stop_event, self.performance_options))
+            process.start()
+            self._processes[station.name] = process
+
+    def poll(self, timeout=0.1):
+        # Dispatches pending station messages; call periodically (e.g. from a Qt timer) or via run_headless()
+        # A process that had exited before the queue was drained has delivered all its messages
+        exited = [name for name, process in self._processes.items() if not process.is_alive()]
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                message = self._messages.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            self._handle(message)
+        for name in exited:
+            if not self.status[name].finished:
+                # Died without reporting, e.g. killed or crashed in native code
+                self._handle((MSG_ERROR, name, f"station process exited with code {self._processes[name].exitcode}"))
+
+    def _handle(self, message):
+        kind, name = message[0], message[1]
+        current = self.status[name]
+        if kind == MSG_STATUS:
+            _, _, counter, feedback, fps = message
+            current = current._replace(counter=counter, feedback=feedback, fps=fps)
+        elif kind == MSG_FINISHED:
+            _, _, counter, duration, fps, reps = message
+            current = current._replace(counter=counter, fps=fps, finished=True)
+            if self._db:
+                exercise_type = get_exercise(self._configs[name].exercise).display_name
+                unlocked = get_achievement_engine().record_workout(self._db, exercise_type, counter, duration, reps)
+                for achievement in unlocked:
+                    logging.info(f"Station {name}: achievement unlocked: {achievement}")
+        elif kind == MSG_ERROR:
+            logging.error(f"Station {name}: {message[2]}")
+            current = current._replace(feedback=f"Error: {message[2]}", finished=True)
+        self.status[name] = current
+        if self.on_status:
+            self.on_status(current)
+
+    def all_finished(self):
+        return all(status.finished for status in self.status.values())
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        # Collect the final counts each station sends on its way out
+        deadline = time.monotonic() + timeout
+        while not self.all_finished() and time.monotonic() < deadline:
+            self.poll(0.1)
+        for process in self._processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.terminate()
+        if self._db:
+            self._db.close()
+
+    def run_headless(self, print_interval=1.0):
+        self.start()
+        try:
+            while not self.all_finished():
+                self.poll(print_interval)
+                print(format_status_line(self.status.values()), flush=True)
+        except KeyboardInterrupt:
+            print("Stopping stations...")
+        finally:
+            self.stop()
+        print(format_status_line(self.status.values()))
+
+def format_status_line(statuses):
+    parts = []
+    for status in statuses:
+        target = f"/{status.target_reps}" if status.target_reps > 0 else ""
+        state = " done" if status.finished else ""
+        parts.append(f"{status.name} [{status.exercise}] {status.counter}{target} ({status.fps:.1f} fps{state})")
+    return " | ".join(parts)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several workout stations concurrently, one process per station.")
+    parser.add_argument("--station", action="append", required=True,
+                        help="Station as source,exercise[,target_reps[,name]]; source is a webcam index or video path. "
+                             "Repeat for each station.")
+    parser.add_argument("--db", type=str, default="workout_history.db",
+                        help="Database that finished workouts are saved to.")
+    parser.add_argument("--no-save", action="store_true",
+                        help="Don't save workouts, e.g. when testing with video files.")
+    parser.add_argument("--print-interval", type=float, default=1.0,
+                        help="Seconds between status lines.")
+    args = parser.parse_args(argv)
+
+    try:
+        stations = [parse_station(spec, i) for i, spec in enumerate(args.station)]
+        manager = StationManager(stations, None if args.no_save else args.db)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    manager.run_headless(args.print_interval)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
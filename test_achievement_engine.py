@@ -0,0 +1,47 @@
+import datetime
+import random
+
+import pytest
+
+from achievement_engine import (ALL_EXERCISES, EMPTY_COUNTERS, AchievementCounters, AchievementEngine, session_rate,
+                                update_counters)
+from database_manager import DatabaseManager
+
+@pytest.fixture
+def db(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / "workouts.db"))
+    yield db_manager
+    db_manager.close()
+
+def test_database_counters_match_update_counters(db):
+    # Mostly consecutive days, with repeats on the same day, gaps that break streaks and some
+    # workouts saved out of order
+    rng = random.Random(7)
+    day = datetime.date(2024, 2, 25)
+    expected = {}
+    for _ in range(400):
+        day += datetime.timedelta(days=rng.choice([0, 0, 1, 1, 1, 2, 5]))
+        workout_day = day - datetime.timedelta(days=rng.randrange(4)) if rng.random() < 0.1 else day
+        exercise_type = rng.choice(["Pushup", "Squat"])
+        completed_reps = rng.randrange(0, 60)
+        duration_seconds = rng.choice([None, 30, 90, 240])
+        date = datetime.datetime.combine(workout_day, datetime.time(7, 15))
+        scopes = (exercise_type, ALL_EXERCISES)
+        db.save_workout_progress(exercise_type, completed_reps, duration_seconds, date, None, scopes,
+                                 session_rate(completed_reps, duration_seconds), ())
+        for scope in scopes:
+            expected[scope] = update_counters(expected.get(scope, EMPTY_COUNTERS), completed_reps, duration_seconds,
+                                              workout_day)
+    db.flush()
+    stored = db.get_achievement_counters(tuple(expected))
+    assert {scope: AchievementCounters(*values) for scope, values in stored.items()} == expected
+
+def test_record_workout_unlocks_each_achievement_once(db):
+    engine = AchievementEngine()
+    assert engine.record_workout(db, "Pushup", 100, 180) == ["First 100 Pushups!", "30 Pushups per Minute"]
+    assert engine.record_workout(db, "Pushup", 120, 180) == []
+    db.flush()
+    assert db.get_achievement_names() == {"First 100 Pushups!", "30 Pushups per Minute"}
+    counters = AchievementCounters(*db.get_achievement_counters(("Pushup",))["Pushup"])
+    assert (counters.workouts, counters.lifetime_reps, counters.best_session_reps) == (2, 220, 120)
+    assert counters.current_streak == 1 and counters.last_day == datetime.date.today().isoformat()
@@ -0,0 +1,99 @@
+import datetime
+import random
+import sqlite3
+
+import pytest
+
+from database_manager import DatabaseManager, WORKOUT_SORT_KEYS
+
+@pytest.fixture
+def db(tmp_path):
+    db_manager = DatabaseManager(str(tmp_path / "workouts.db"))
+    yield db_manager
+    db_manager.close()
+
+def _rollups(db):
+    db.flush()
+    conn = sqlite3.connect(db.db_name)
+    try:
+        return sorted(conn.execute("SELECT * FROM workout_rollups").fetchall())
+    finally:
+        conn.close()
+
+def test_incremental_rollups_match_a_rebuild(db):
+    rng = random.Random(3)
+    start = datetime.datetime(2023, 12, 20, 7, 30)
+    for _ in range(300):
+        date = start + datetime.timedelta(days=rng.randrange(60), hours=rng.randrange(16))
+        duration = rng.choice([None, rng.randrange(30, 900)])
+        db.save_workout(rng.choice(["Pushup", "Squat"]), rng.randrange(0, 40), duration, date)
+    incremental = _rollups(db)
+    db.rebuild_rollups()
+    assert incremental and _rollups(db) == incremental
+
+def test_time_series_buckets_by_date_intervals(db):
+    for day in range(1, 11):
+        db.save_workout("Squat", day, 60, datetime.datetime(2024, 1, day, 12))
+    db.save_workout("Squat", 100, 60, datetime.datetime(2024, 12, 31, 12))
+    db.flush()
+
+    dates, values = db.get_time_series("total_reps", "day")
+    assert len(dates) == 11 and dates[-1] == datetime.date(2024, 12, 31) and sum(values) == 155
+
+    # 366 days in 4 intervals of 92 days: January's workouts share the first, December's is alone in the last
+    dates, values = db.get_time_series("total_reps", "day", max_points=4)
+    assert dates == [datetime.date(2024, 1, 1), datetime.date(2024, 10, 3)]
+    assert values == [55, 100]
+    dates, values = db.get_time_series("max_reps", "day", max_points=4)
+    assert values == [10, 100]
+
+def _all_pages(get_page, limit, **kwargs):
+    rows, after = [], None
+    while True:
+        page = get_page(limit, after, **kwargs)
+        rows.extend(page)
+        if len(page) < limit:
+            return rows
+        after = (page[-1][-1], page[-1][0])
+
+def test_keyset_pages_have_no_gaps_or_duplicates(db):
+    # Few distinct values per column, so most sort keys are shared by many rows
+    rng = random.Random(5)
+    start = datetime.datetime(2024, 3, 1, 18)
+    for _ in range(120):
+        date = start + datetime.timedelta(days=rng.randrange(5))
+        db.save_workout(rng.choice(["Pushup", "Squat"]), rng.randrange(5), rng.choice([None, 60, 120]), date)
+    db.flush()
+    workouts = [row[:5] for row in db.get_all_workouts()]
+    sort_values = {
+        "date": lambda row: row[1],
+        "exercise_type": lambda row: row[2],
+        "completed_reps": lambda row: row[3],
+        "duration_seconds": lambda row: -1 if row[4] is None else row[4],
+    }
+    assert set(sort_values) == set(WORKOUT_SORT_KEYS)
+    for sort_column, sort_value in sort_values.items():
+        for descending in (True, False):
+            for exercise_type in (None, "Squat"):
+                expected = sorted((row for row in workouts if exercise_type in (None, row[2])),
+                                  key=lambda row: (sort_value(row), row[0]), reverse=descending)
+                for limit in (1, 7, 200):
+                    rows = _all_pages(db.get_workouts_page, limit, sort_column=sort_column, descending=descending,
+                                      exercise_type=exercise_type)
+                    assert [row[:5] for row in rows] == expected
+
+    dates = _all_pages(db.get_workouts_page, 9, date_from="2024-03-02 00:00:00", date_to="2024-03-03 23:59:59")
+    assert [row[:5] for row in dates] == [row for row in workouts if "2024-03-02" <= row[1][:10] <= "2024-03-03"]
+
+def test_achievement_pages_have_no_gaps_or_duplicates(db):
+    # Saved within a second or two, so the rows share date sort keys
+    for i in range(25):
+        db.save_achievement(f"Achievement {i}")
+    db.flush()
+    achievements = [row[:3] for row in db.get_all_achievements()]
+    assert len(achievements) == 25
+    for sort_column, sort_value in (("date", lambda row: row[1]), ("name", lambda row: row[2])):
+        for descending in (True, False):
+            expected = sorted(achievements, key=lambda row: (sort_value(row), row[0]), reverse=descending)
+            rows = _all_pages(db.get_achievements_page, 4, sort_column=sort_column, descending=descending)
+            assert [row[:3] for row in rows] == expected
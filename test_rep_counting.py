@@ -0,0 +1,69 @@
+import numpy as np
+
+from benchmark import synthetic_landmarks
+from pose_features import joint_angles
+from rep_counting import (PUSHUP_RULE, SQUAT_RULE, EVENT_REP, NO_POSE_FEEDBACK, count_reps, count_reps_from_angles,
+                          event_feedback, rule_angle, step, summarize_chunk, stitch_chunks)
+
+def _random_angles(rng, frames):
+    # Mostly in-between angles with runs past both thresholds and some frames without a pose
+    angles = rng.choice([10.0, 20.0, 60.0, 100.0, 120.0, 150.0, 170.0, 175.0], size=frames)
+    angles[rng.random(frames) < 0.05] = np.nan
+    return angles
+
+def _step_through(angles, rule, counter=0, stage=None):
+    # Reference: the per-frame state machine the live detectors run
+    events = []
+    for angle in angles:
+        counter, stage, event = step(rule, counter, stage, angle)
+        events.append(event)
+    return counter, stage, events
+
+def test_counting_from_angles_matches_stepping_frame_by_frame():
+    rng = np.random.default_rng(0)
+    for rule in (PUSHUP_RULE, SQUAT_RULE):
+        for initial_stage in (None, "down", "up"):
+            for _ in range(50):
+                angles = _random_angles(rng, int(rng.integers(0, 200)))
+                result = count_reps_from_angles(angles, rule, 2, initial_stage)
+                counter, stage, events = _step_through(angles, rule, 2, initial_stage)
+                assert (result.counter, result.stage) == (counter, stage)
+                assert result.events.tolist() == events
+                assert result.rep_frames.tolist() == [i for i, event in enumerate(events) if event == EVENT_REP]
+                if len(angles):
+                    expected = NO_POSE_FEEDBACK if np.isnan(angles[-1]) else event_feedback(rule, events[-1])
+                    assert result.feedback == expected
+
+def test_counting_landmarks_matches_stepping_frame_by_frame():
+    frames = synthetic_landmarks(600)
+    for rule in (PUSHUP_RULE, SQUAT_RULE):
+        result = count_reps(frames, rule)
+        angles = [float(rule_angle(joint_angles(frame), rule)) for frame in frames]
+        counter, stage, events = _step_through(angles, rule)
+        assert result.counter > 0
+        assert (result.counter, result.stage, result.events.tolist()) == (counter, stage, events)
+
+def test_stitched_chunks_match_counting_the_whole_stream():
+    rng = np.random.default_rng(1)
+    for rule in (PUSHUP_RULE, SQUAT_RULE):
+        for _ in range(50):
+            angles = _random_angles(rng, 300)
+            bounds = [0] + sorted(rng.choice(np.arange(1, 300), size=4, replace=False).tolist()) + [300]
+            chunks = [summarize_chunk(angles[start:end], rule, start) for start, end in zip(bounds[:-1], bounds[1:])]
+            expected = count_reps_from_angles(angles, rule)
+            # Chunks may finish in any order
+            counter, stage, rep_frames = stitch_chunks(reversed(chunks))
+            assert counter == expected.counter
+            assert stage == expected.stage
+            assert rep_frames.tolist() == expected.rep_frames.tolist()
+
+def test_stitching_continues_from_the_given_state():
+    angles = np.array([20.0, 100.0, 170.0, 20.0])
+    chunks = [summarize_chunk(angles[:2], PUSHUP_RULE, 0), summarize_chunk(angles[2:], PUSHUP_RULE, 2)]
+    assert stitch_chunks(chunks, 5, "down")[:2] == (7, "up")
+    counter, stage, rep_frames = stitch_chunks(chunks)
+    assert (counter, stage, rep_frames.tolist()) == (1, "up", [3])
+
+def test_no_chunks():
+    counter, stage, rep_frames = stitch_chunks([], 3, "down")
+    assert (counter, stage, len(rep_frames)) == (3, "down", 0)
@@ -0,0 +1,144 @@
+import logging
+import queue
+import threading
+import time
+
+import cv2
+
+from frame_buffers import FrameRecycler
+
+# Playback modes for video files.
+# "max" decodes on a prefetch thread that keeps a bounded queue of frames ahead of the reader,
+# so decoding overlaps inference and a recording is analysed as fast as the model allows.
+# "paced" plays the file in real time by its frame timestamps, like a live camera: frames are
+# held until they are due and skipped when the reader has fallen too far behind.
+PLAYBACK_MAX_THROUGHPUT = "max"
+PLAYBACK_PACED = "paced"
+PLAYBACK_MODES = (PLAYBACK_MAX_THROUGHPUT, PLAYBACK_PACED)
+
+# Marks the end of the file inside the prefetch queue
+_END_OF_FILE = object()
+
+def open_video_source(video_source_type, video_source_path, playback=PLAYBACK_MAX_THROUGHPUT, prefetch_size=8):
+    # Returns an object with the cv2.VideoCapture read()/isOpened()/get()/release() interface
+    if video_source_type == "webcam":
+        cap = cv2.VideoCapture(int(video_source_path) if str(video_source_path).isdigit() else 0) # Webcam
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1) # Don't let the driver queue stale frames
+        return cap
+    if playback not in PLAYBACK_MODES:
+        logging.warning(f"Unknown playback mode '{playback}', using '{PLAYBACK_MAX_THROUGHPUT}'")
+        playback = PLAYBACK_MAX_THROUGHPUT
+    return FileVideoSource(video_source_path, playback, prefetch_size)
+
+class FileVideoSource:
+    def __init__(self, path, playback=PLAYBACK_MAX_THROUGHPUT, prefetch_size=8, max_lag_frames=2):
+        self.path = path
+        self.playback = playback
+        self.prefetch_size = prefetch_size
+        self.cap = cv2.VideoCapture(path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) or 30.0
+        # In paced mode, frames later than this are skipped to catch up
+        self.max_lag = max_lag_frames / self.fps
+        self.frames_read = 0
+        self.frames_skipped = 0
+        # Presentation time (seconds) of the frame last returned by read()
+        self.timestamp = None
+        self._queue = None
+        self._stop_event = None
+        self._decoder = None
+        self._finished = False
+        self._clock_start = None
+        # Frames handed back through read(image) are decoded into again
+        self._recycler = FrameRecycler(prefetch_size + 2)
+        if self.cap.isOpened():
+            self._start_decoder()
+
+    def _start_decoder(self):
+        self._queue = queue.Queue(maxsize=max(1, self.prefetch_size))
+        self._stop_event = threading.Event()
+        self._decoder = threading.Thread(target=self._decode, args=(self._queue, self._stop_event),
+                                         name="VideoPrefetch", daemon=True)
+        self._decoder.start()
+
+    def _stop_decoder(self):
+        if self._decoder is None:
+            return
+        self._stop_event.set()
+        # Unblock a decoder waiting for room in the queue
+        while self._decoder.is_alive():
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                self._decoder.join(0.05)
+        self._decoder = None
+
+    def _decode(self, frames, stop_event):
+        index = int(self.cap.get(cv2.CAP_PROP_POS_FRAMES))
+        last_timestamp = -1.0
+        item = None
+        while not stop_event.is_set():
+            if item is None:
+                ret, frame = self.cap.read(self._recycler.acquire())
+                if not ret:
+                    item = _END_OF_FILE
+                else:
+                    # Presentation time in seconds; fall back to the frame rate if the container has none
+                    timestamp = self.cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+                    if timestamp <= last_timestamp:
+                        timestamp = index / self.fps
+                    last_timestamp = timestamp
+                    index += 1
+                    item = (timestamp, frame)
+            try:
+                frames.put(item, timeout=0.1)
+            except queue.Full:
+                continue
+            if item is _END_OF_FILE:
+                break
+            item = None
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def get(self, prop):
+        return self.cap.get(prop)
+
+    def read(self, image=None):
+        # Like VideoCapture.read(image): `image` is a frame the caller is done with, which is reused
+        # for decoding. The returned frame is generally a different array.
+        self._recycler.release(image)
+        while not self._finished and self._decoder is not None:
+            item = self._queue.get()
+            if item is _END_OF_FILE:
+                self._finished = True
+                break
+            timestamp, frame = item
+            if self.playback == PLAYBACK_PACED:
+                now = time.perf_counter()
+                if self._clock_start is None:
+                    self._clock_start = now - timestamp
+                delay = self._clock_start + timestamp - now
+                if delay < -self.max_lag:
+                    self.frames_skipped += 1
+                    self._recycler.release(frame)
+                    continue
+                if delay > 0:
+                    time.sleep(delay)
+            self.frames_read += 1
+            self.timestamp = timestamp
+            return True, frame
+        return False, None
+
+    def seek(self, seconds):
+        # Restarts decoding (and, in paced mode, the playback clock) at the given position
+        self._stop_decoder()
+        self.cap.set(cv2.CAP_PROP_POS_MSEC, max(0.0, seconds) * 1000.0)
+        self._finished = False
+        self._clock_start = None
+        self.timestamp = None
+        self._start_decoder()
+
+    def release(self):
+        self._stop_decoder()
+        self._finished = True
+        self.cap.release()